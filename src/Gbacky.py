@@ -14,33 +14,77 @@
 #
 
 import os
+import re
 import sys
+import shlex
 import subprocess
 import hashlib
-import shutil
 import json
 import time
+import collections
 import concurrent.futures
 from datetime import datetime
+from urllib.parse import unquote
 
 from PySide2.QtWidgets import (QApplication, QWidget, QVBoxLayout,
                                QPlainTextEdit, QPushButton, QHBoxLayout, QStackedLayout,
                                QLabel, QToolButton, QStyle, QFormLayout, QLineEdit, QFileDialog, QSizePolicy, QGridLayout, QMessageBox, QListWidget, QListWidgetItem, QAbstractItemView, QCheckBox, QInputDialog,
                                QSpinBox, QProgressBar, QAction)
-from PySide2.QtCore import QObject, Signal, Slot, QThread, Qt, QTimer, QSize
-from PySide2.QtGui import QFont, QIntValidator, QColor, QKeySequence
+from PySide2.QtCore import QObject, QRunnable, QThreadPool, Signal, Slot, QThread, Qt, QTimer, QSize
+from PySide2.QtGui import QFont, QIntValidator, QColor, QKeySequence, QTextCursor
 
-from config_utils import load_config, save_config
+from config_utils import load_config, save_config, validate_config, load_verified_uploads, save_verified_upload
 from settings_io import export_settings_to_file, import_settings_from_file
-from sudo_utils import is_password_required, setup_passwordless_sudo, remove_passwordless_sudo, verify_sudo_password
+from sudo_utils import is_password_required, setup_passwordless_sudo, remove_passwordless_sudo, verify_sudo_password_async
 from settings import SettingsWindow
-from file_utils import copy_file_with_watchdog, calculate_sha256_with_watchdog, calculate_sha256_local, CancellationError
-from command_runner import run_command, run_with_timeout
-from veracrypt_utils import get_mount_point
+from file_utils import copy_and_hash_source, calculate_sha256_with_watchdog, calculate_sha256_shani, resolve_hash_algo, CancellationError, IO_CHUNK
+from command_runner import run_command, run_with_timeout, cached_which, BatchingLogSink
+from veracrypt_utils import cached_get_mount_point, invalidate_mount_cache, veracrypt_command
 from credentials_manager import get_veracrypt_password, set_veracrypt_password
 
-
-RSYNC_OPTIONS = "-azhi"  # Use 'i' for itemize-changes instead of 'v' for verbose
+# Vault and backup paths in profiles are relative to the user's home directory.
+HOME_DIR = os.path.expanduser('~')
+
+QWIDGETSIZE_MAX = (1 << 24) - 1  # Qt's maximum widget size; not exported by PySide2
+
+LOG_MAX_BLOCKS = 5000  # Lines kept in the details log
+LOG_FLUSH_INTERVAL_MS = 100  # Log messages are collected and added to the log at most this often
+
+
+# Use 'i' for itemize-changes instead of 'v' for verbose. No '-z': the destination is
+# the local VeraCrypt mount, where compression only costs CPU. '--inplace --partial'
+# lets an interrupted run pick up where it left off.
+RSYNC_OPTIONS = ["-ahi", "--inplace", "--partial"]
+RSYNC_PARALLEL_DEFAULT = 3  # Number of directories synced concurrently (config: RSYNC_PARALLEL)
+# A source directory with at least this many subdirectories is synced with one rsync
+# per top-level subdirectory (config: RSYNC_INTRA_PARALLEL), since rsync itself is single-threaded.
+# Each split job has its own transfer root (see _rsync_jobs), so splitting is skipped
+# when RSYNC_EXTRA_OPTS has filter or delete options, which depend on that root.
+RSYNC_SPLIT_MIN_SUBDIRS = 4
+RSYNC_ROOT_SENSITIVE_OPTS = ("--exclude", "--include", "--filter", "--delete", "--cvs-exclude")
+
+def _has_root_sensitive_opts(options):
+    """True if any rsync option filters or deletes files, including short forms like -f and -C."""
+    for opt in options:
+        if opt.startswith(RSYNC_ROOT_SENSITIVE_OPTS):
+            return True
+        if opt.startswith("-") and not opt.startswith("--") and any(c in opt[1:] for c in "fFC"):
+            return True
+    return False
+
+# Probes the Google Drive path ($1) and creates the backup directory ($2) in one process.
+GDRIVE_READY_TIMEOUT = 4.0  # Seconds to wait for Google Drive after an auto-mount
+GDRIVE_PATH_MISSING = 10
+GDRIVE_MKDIR_FAILED = 20
+GDRIVE_PREPARE_SCRIPT = f'test -d "$1" || exit {GDRIVE_PATH_MISSING}; mkdir -p "$2" || exit {GDRIVE_MKDIR_FAILED}'
+
+# Matches the mount parameters in a GVFS path, e.g. '/gvfs/google-drive:host=gmail.com,user=someone/...'
+_GVFS_GDRIVE_RE = re.compile(r"/gvfs/google-drive:(?P<params>[^/]+)")
+_GVFS_PARAM_RE = re.compile(r"(user|host)=([^,]+)")
+
+def rsync_output_filter(line, _startswith=str.startswith):
+    """Keeps only the itemized lines for transferred files ('>f...'). Called once per output line."""
+    return line if _startswith(line, '>') else None
 
 # Error codes for better error handling
 class StatusCodes:
@@ -87,6 +131,8 @@ class BackupWorker(QObject):
         self.config = config
         self.profile = profile
         self.sudo_password = sudo_password
+        self.veracrypt_vault = os.path.join(HOME_DIR, profile.get("VERACRYPT_VAULT", ""))
+        self.backup_dirs = [os.path.join(HOME_DIR, d) for d in profile.get("BACKUP_DIRS", [])]
         
         # Get network quality setting and set timeouts accordingly
         network_quality = self.config.get("NETWORK_QUALITY", 0)  # 0=good, 1=poor, 2=terrible
@@ -100,6 +146,13 @@ class BackupWorker(QObject):
         self.io_timeout = timeouts[0]
         self.cmd_timeout = timeouts[1]
         self.probe_timeout = timeouts[2]
+        # Chunk size for copying and hashing the vault on Google Drive.
+        self.io_chunk = int(self.config.get("IO_CHUNK_BYTES", IO_CHUNK))
+
+        # Extra rsync options from the config, e.g. "--exclude=.cache".
+        extra_rsync_options = shlex.split(self.config.get("RSYNC_EXTRA_OPTS", ""))
+        self.rsync_options = RSYNC_OPTIONS + extra_rsync_options
+        self.rsync_split_allowed = not _has_root_sensitive_opts(extra_rsync_options)
 
         self.was_successful = True
         self.current_step = ""
@@ -127,19 +180,12 @@ class BackupWorker(QObject):
 
             # Extract email from the GVFS path if possible
             # Path format: /run/user/{uid}/gvfs/google-drive:host=gmail.com,user=brett.the.james/...
-            user_email = None
-            host = None
-            
-            if "/gvfs/google-drive:" in gdrive_path:
-                parts = gdrive_path.split("google-drive:")
-                if len(parts) > 1:
-                    mount_info = parts[1].split("/")[0]  # Get the part before the first /
-                    for param in mount_info.split(","):
-                        if param.startswith("user="):
-                            user_email = param.split("=", 1)[1]
-                        elif param.startswith("host="):
-                            host = param.split("=", 1)[1]
-            
+            match = _GVFS_GDRIVE_RE.search(gdrive_path)
+            params = dict(_GVFS_PARAM_RE.findall(match.group("params"))) if match else {}
+            # GVFS URL-encodes the values (e.g. 'user=foo%40bar.com').
+            user_email = unquote(params["user"]) if "user" in params else None
+            host = unquote(params["host"]) if "host" in params else None
+
             # Reconstruct full email address if we have both parts
             if user_email and host:
                 if "@" not in user_email:  # user_email is just the username part
@@ -156,19 +202,16 @@ class BackupWorker(QObject):
             
             # Use gio mount to mount the Google Drive
             mount_uri = f"google-drive://{full_email}/"
-            run_kwargs = {
-                'capture_output': True,
-                'text': True
-            }
-            if self.cmd_timeout is not None:
-                run_kwargs['timeout'] = self.cmd_timeout
-            result = subprocess.run(['gio', 'mount', mount_uri], **run_kwargs)
+            # Only stderr is needed, and only on failure, so don't capture or decode stdout.
+            result = subprocess.run(['gio', 'mount', mount_uri], stdout=subprocess.DEVNULL,
+                                    stderr=subprocess.PIPE, timeout=self.cmd_timeout)
             
             if result.returncode == 0:
                 self.log_message.emit("Google Drive mount successful")
                 return True # The calling function will now poll for readiness.
             else:
-                self.log_message.emit(f"Google Drive mount failed: {result.stderr.strip()}")
+                err = result.stderr.decode('utf-8', 'replace').strip()
+                self.log_message.emit(f"Google Drive mount failed: {err}")
                 return False
                 
         except subprocess.TimeoutExpired:
@@ -180,14 +223,126 @@ class BackupWorker(QObject):
 
     def _check_prerequisites(self):
         """Verify that required commands exist."""
-        if not shutil.which("veracrypt"):
+        if not cached_which("veracrypt"):
+            # Forget the lookup so that "Try Again" notices a freshly installed tool.
+            cached_which.cache_clear()
             self._emit_main_status_change(StatusCodes.GENERAL_ERROR, "'veracrypt' command not found.")
             return False
-        if not shutil.which("rsync"):
+        if not cached_which("rsync"):
+            cached_which.cache_clear()
             self._emit_main_status_change(StatusCodes.GENERAL_ERROR, "'rsync' command not found.")
             return False
         return True
 
+    def _prepare_gdrive_dest(self, gdrive_path, dest_dir):
+        """
+        Probes the Google Drive base path and creates the backup directory in one
+        external command, run under the watchdog.
+        Returns a tuple (gdrive_path_accessible, mkdir_error).
+        """
+        command = ["sh", "-c", GDRIVE_PREPARE_SCRIPT, "sh", gdrive_path, dest_dir]
+        try:
+            # This is mainly the readiness probe, so a hung mount must be detected as
+            # quickly as with a plain 'test -d', before auto-mount is tried.
+            run_with_timeout(
+                subprocess.run,
+                args=(command,),
+                kwargs={'check': True, 'capture_output': True, 'text': True},
+                timeout=self.probe_timeout
+            )
+            return True, None
+        except subprocess.CalledProcessError as e:
+            if e.returncode == GDRIVE_MKDIR_FAILED:
+                return True, e.stderr.strip() or str(e)
+            return False, None
+        except TimeoutError:
+            return False, None
+
+    def _stat_remote(self, path):
+        """
+        Returns (size, mtime) of a file on Google Drive, or None if it cannot be read.
+        Uses an external 'stat' under the watchdog, like the other Google Drive probes.
+        """
+        try:
+            process = run_with_timeout(
+                subprocess.run,
+                args=(["stat", "-c", "%s %Y", path],),
+                kwargs={'check': True, 'capture_output': True, 'text': True},
+                timeout=self.probe_timeout
+            )
+            size, mtime = process.stdout.split()
+            return int(size), int(mtime)
+        except (subprocess.CalledProcessError, TimeoutError, ValueError):
+            return None
+
+    def _record_verified_upload(self, dest_file_path, source_hash, hash_algo, local_signature):
+        """Remembers a verified upload so an unchanged vault can skip the next copy."""
+        dest_stat = self._stat_remote(dest_file_path)
+        if not dest_stat:
+            return
+        # Not stored in self.config: the GUI thread shares that dict and saves it too.
+        success, error_msg = save_verified_upload(dest_file_path, {
+            "SIZE": dest_stat[0], "MTIME": dest_stat[1], "HASH": source_hash, "HASH_ALGO": hash_algo,
+            "LOCAL": local_signature
+        })
+        if not success:
+            self.log_message.emit(f"Warning: could not record the verified upload: {error_msg}")
+
+    def _rsync_jobs(self, src_dir, mount_point):
+        """
+        Returns the rsync source/destination argument lists needed to sync src_dir
+        into the vault. Large directories are split into one job per top-level
+        subdirectory plus one for the loose files, so they can run concurrently.
+        A single job is rooted at src_dir's parent, the loose-files job at src_dir
+        itself and each subdirectory job at src_dir. Anchored filters and --delete
+        would act differently under those roots, so with such options in
+        RSYNC_EXTRA_OPTS the directory is always synced as one job.
+        """
+        src_name = os.path.basename(src_dir)
+        if not (self.config.get("RSYNC_INTRA_PARALLEL", True) and src_name and self.rsync_split_allowed):
+            return [[src_dir, mount_point]]
+        try:
+            # Symlinks to directories stay with the loose files, as rsync copies them as links.
+            subdirs = sorted(e.path for e in os.scandir(src_dir) if e.is_dir(follow_symlinks=False))
+            if len(subdirs) < RSYNC_SPLIT_MIN_SUBDIRS:
+                return [[src_dir, mount_point]]
+            dest = os.path.join(mount_point, src_name)
+            # Create the common parent up front so the concurrent rsyncs don't race on it.
+            os.makedirs(dest, exist_ok=True)
+        except OSError:
+            return [[src_dir, mount_point]]
+        # The loose-files job syncs the directory itself but skips its top-level subdirectories.
+        jobs = [["--exclude=/*/", src_dir + "/", dest + "/"]]
+        jobs += [[sub, dest + "/"] for sub in subdirs]
+        return jobs
+
+    def _run_rsync(self, src_dir, rsync_args, tag_lines=False):
+        """
+        Runs one rsync job (see _rsync_jobs) for a source directory.
+        Runs on an executor thread; log lines are streamed to the GUI in batches.
+        With tag_lines, each line is prefixed with the job's label, so the output
+        of concurrent rsyncs can still be told apart where their batches interleave.
+        Returns a tuple (src_dir, ok).
+        """
+        if self._cancellation_requested: raise CancellationError("Backup cancelled by user.")
+
+        source = rsync_args[-2].rstrip("/")
+        label = os.path.relpath(source, os.path.dirname(src_dir))
+        log_sink = BatchingLogSink(self.log_message.emit)
+        log = log_sink.push
+        if tag_lines:
+            prefix = f"[{label}] "
+            def log(message):
+                log_sink.push('\n'.join(prefix + line for line in message.split('\n')))
+        try:
+            log_sink.push(f"\nBacking up '{label}'...")
+            rsync_command = ["rsync", *self.rsync_options, *rsync_args]
+            # rsync doesn't need sudo
+            process = run_command(rsync_command, log_callback=log, output_filter=rsync_output_filter)
+        finally:
+            log_sink.flush()
+        return source, process is not None
+
     @Slot()
     def run(self):
         """The main logic for the backup process."""
@@ -198,9 +353,8 @@ class BackupWorker(QObject):
             if not self._check_prerequisites():
                 return
 
-            home_dir = os.path.expanduser('~')
-            veracrypt_vault = os.path.join(home_dir, self.profile["VERACRYPT_VAULT"])
-            backup_dirs = [os.path.join(home_dir, d) for d in self.profile["BACKUP_DIRS"]]
+            veracrypt_vault = self.veracrypt_vault
+            backup_dirs = self.backup_dirs
 
             # --- Retrieve password from keyring ---
             self.status_update.emit("Retrieving credentials...")
@@ -210,14 +364,12 @@ class BackupWorker(QObject):
                 return
             # ---
 
-            base_command = ["veracrypt", "--text", "--non-interactive"]
-
             # --- Step 1: Check for existing mount ---
             self.current_step = "CHECKING_MOUNT"; self.step_changed.emit(self.current_step)
             self.status_update.emit("Step 1: Checking VeraCrypt vault status...")
             if self._cancellation_requested: raise CancellationError("Backup cancelled by user.")
 
-            mount_point = get_mount_point(veracrypt_vault, self.sudo_password, self.log_message.emit)
+            mount_point = cached_get_mount_point(veracrypt_vault, self.sudo_password, self.log_message.emit)
 
             if mount_point:
                 self.status_update.emit(f"Vault already mounted at {mount_point}. Skipping mount step.")
@@ -229,22 +381,23 @@ class BackupWorker(QObject):
                     self._emit_main_status_change(StatusCodes.GENERAL_ERROR, f"VeraCrypt vault not found at '{veracrypt_vault}'.")
                     return
                 
-                mount_args = ["--mount", veracrypt_vault, "--password", veracrypt_password]
-                mount_command = base_command + mount_args
+                mount_command = veracrypt_command("--mount", veracrypt_vault, "--password", veracrypt_password)
 
                 if self._cancellation_requested: raise CancellationError("Backup cancelled by user.")
                 process = run_command(mount_command, sudo_password=self.sudo_password, log_callback=self.log_message.emit)
+                invalidate_mount_cache()
                 if process is None:
                     self._emit_main_status_change(StatusCodes.GENERAL_ERROR, "Failed to mount VeraCrypt vault.")
                     return
                 
                 did_i_mount_it = True
-                mount_point = get_mount_point(veracrypt_vault, self.sudo_password, self.log_message.emit)
+                mount_point = cached_get_mount_point(veracrypt_vault, self.sudo_password, self.log_message.emit)
                 if not mount_point:
                     # This is a safety dismount, in case it mounted but we can't find it.
-                    dismount_command = base_command + ["--dismount", veracrypt_vault]
+                    dismount_command = veracrypt_command("--dismount", veracrypt_vault)
                     # We don't care about the result of this safety dismount, just that we tried.
                     run_command(dismount_command, sudo_password=self.sudo_password, log_callback=self.log_message.emit)
+                    invalidate_mount_cache()
                     self._emit_main_status_change(StatusCodes.GENERAL_ERROR, "Could not determine mount point after mounting.")
                     return
 
@@ -252,25 +405,37 @@ class BackupWorker(QObject):
             self.current_step = "RSYNCING"; self.step_changed.emit(self.current_step)
             self.status_update.emit(f"Vault is ready at: {mount_point}")
             self.status_update.emit("Step 2: Backing up directories with rsync...")
-            for src_dir in backup_dirs:
-                if not os.path.exists(src_dir):
-                    self.log_message.emit(f"Warning: Source directory not found, skipping: {src_dir}")
-                    continue
-                if self._cancellation_requested: raise CancellationError("Backup cancelled by user.")
-                self.log_message.emit(f"\nBacking up '{os.path.basename(src_dir)}'...")
-                rsync_command = ["rsync", RSYNC_OPTIONS, src_dir, mount_point]
-                rsync_filter = lambda line: line if line.startswith('>') else None
-                # rsync doesn't need sudo
-                if run_command(rsync_command, log_callback=self.log_message.emit, output_filter=rsync_filter) is None:
-                    self.log_message.emit(f"ERROR: Failed to back up {src_dir}. Continuing...")
+            # Each source directory is synced independently, so run a few rsyncs at once.
+            # Keep the worker count small to avoid thrashing the VeraCrypt mount.
+            max_workers = self.config.get("RSYNC_PARALLEL", RSYNC_PARALLEL_DEFAULT)
+            max_workers = max(1, max_workers)
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+            try:
+                futures = []
+                for src_dir in backup_dirs:
+                    if not os.path.exists(src_dir):
+                        self.log_message.emit(f"Warning: Source directory not found, skipping: {src_dir}")
+                        continue
+                    for rsync_args in self._rsync_jobs(src_dir, mount_point):
+                        futures.append(executor.submit(self._run_rsync, src_dir, rsync_args, max_workers > 1))
+                for future in futures:
+                    src_dir, ok = future.result()
+                    if not ok:
+                        self.log_message.emit(f"ERROR: Failed to back up {src_dir}. Continuing...")
+            except CancellationError:
+                executor.shutdown(wait=True, cancel_futures=True)
+                raise
+            finally:
+                executor.shutdown(wait=True)
             self.status_update.emit("Local backup to vault complete.")
 
             # --- Step 3: Unmount (if we mounted it) ---
             if did_i_mount_it:
                 self.current_step = "UNMOUNTING"; self.step_changed.emit(self.current_step)
                 self.status_update.emit("Step 3: Unmounting VeraCrypt Vault...")
-                dismount_command = base_command + ["--dismount", mount_point]
+                dismount_command = veracrypt_command("--dismount", mount_point)
                 run_command(dismount_command, sudo_password=self.sudo_password, log_callback=self.log_message.emit)
+                invalidate_mount_cache()
                 mount_point = None # Mark as unmounted
 
             # --- Step 4: Off-site Backup ---
@@ -289,44 +454,37 @@ class BackupWorker(QObject):
             # a timeout. This is much safer than using Python's 'os' module directly,
             # which can crash the entire application if the mount is hung.
 
-            # Step 4a: Probe the base directory. 'test -d' is a lightweight check.
-            gdrive_path_accessible = False
+            # Step 4a: Probe the base directory and create the destination directory
+            # ('test -d' + 'mkdir -p') with a single external command.
             try:
                 self.log_message.emit(f"Probing Google Drive base path: {gdrive_path}")
-                # Use the watchdog to run the command safely.
-                run_with_timeout(
-                    subprocess.run,
-                    args=(['test', '-d', gdrive_path],),
-                    kwargs={'check': True},
-                    timeout=self.probe_timeout
-                )
-                gdrive_path_accessible = True
-            except (subprocess.CalledProcessError, TimeoutError):
+                self.log_message.emit(f"Ensuring backup directory exists: {dest_dir}")
+                gdrive_path_accessible, mkdir_error = self._prepare_gdrive_dest(gdrive_path, dest_dir)
                 # Path is not accessible or timed out. Try to auto-mount if enabled.
-                if self.config.get("AUTO_MOUNT_GDRIVE", True):
+                if not gdrive_path_accessible and self.config.get("AUTO_MOUNT_GDRIVE", True):
                     if self._attempt_google_drive_mount(gdrive_path):
                         self.log_message.emit("Auto-mount successful, waiting for filesystem to become responsive...")
                         # After a successful mount, the filesystem might not be ready immediately.
-                        # We'll poll it a few times before giving up.
-                        for i in range(5): # Retry up to 5 times (total of ~4 seconds wait)
-                            try:
-                                run_with_timeout(
-                                    subprocess.run,
-                                    args=(['test', '-d', gdrive_path],),
-                                    kwargs={'check': True},
-                                    timeout=self.probe_timeout
-                                )
-                                gdrive_path_accessible = True
+                        # Poll it with exponential backoff (50ms, 100ms, ... capped at 1s), so a fast
+                        # mount is picked up quickly while a slow one still gets GDRIVE_READY_TIMEOUT.
+                        delay = 0.05
+                        deadline = time.monotonic() + GDRIVE_READY_TIMEOUT
+                        while True:
+                            if self._cancellation_requested: raise CancellationError("Backup cancelled by user.")
+                            gdrive_path_accessible, mkdir_error = self._prepare_gdrive_dest(gdrive_path, dest_dir)
+                            if gdrive_path_accessible:
                                 self.log_message.emit("Google Drive path now accessible after auto-mount.")
                                 break # Success, exit the retry loop
-                            except (subprocess.CalledProcessError, TimeoutError):
-                                if i < 4: # Don't sleep on the last attempt
-                                    self.log_message.emit(f"Path not ready yet, retrying in 1 second... ({i+1}/4)")
-                                    time.sleep(1)
-                                else:
-                                    # All retries failed
-                                    pass
-
+                            remaining = deadline - time.monotonic()
+                            if remaining <= 0: # Out of time; don't sleep after the last attempt
+                                break
+                            delay = min(delay, remaining)
+                            self.log_message.emit(f"Path not ready yet, retrying in {int(delay * 1000)} ms...")
+                            time.sleep(delay)
+                            delay = min(delay * 2, 1.0)
+
+            except CancellationError:
+                raise
             except Exception as e:
                 self._emit_main_status_change(StatusCodes.GENERAL_ERROR, f"Unexpected error checking Google Drive path: {e}")
                 return
@@ -335,55 +493,71 @@ class BackupWorker(QObject):
                 self._emit_main_status_change(StatusCodes.GDRIVE_NOT_MOUNTED, f"Google Drive path is not accessible or not responding: {gdrive_path}")
                 return
 
-            # Step 4b: Create the destination directory. 'mkdir -p' is like os.makedirs(exist_ok=True).
-            try:
-                self.log_message.emit(f"Ensuring backup directory exists: {dest_dir}")
-                run_with_timeout(
-                    subprocess.run,
-                    args=(['mkdir', '-p', dest_dir],),
-                    kwargs={'check': True},
-                    timeout=self.cmd_timeout
-                )
-            except (subprocess.CalledProcessError, TimeoutError) as e:
-                self._emit_main_status_change(StatusCodes.GDRIVE_WRITE_FAILED, f"Could not create Google Drive directory: {dest_dir}\nError: {e}")
+            # Step 4b: The base path exists, but 'mkdir -p' may still have failed.
+            if mkdir_error:
+                self._emit_main_status_change(StatusCodes.GDRIVE_WRITE_FAILED, f"Could not create Google Drive directory: {dest_dir}\nError: {mkdir_error}")
                 return
-            except Exception as e:
-                self._emit_main_status_change(StatusCodes.GENERAL_ERROR, f"Unexpected error creating Google Drive directory: {e}")
-                return
-            
+
             self.current_step = "COPYING_TO_GDRIVE"; self.step_changed.emit(self.current_step)
             dest_file_path = os.path.join(dest_dir, os.path.basename(veracrypt_vault))
-            # Perform the copy and hashing using the new utility functions
-            copy_file_with_watchdog(
+            # Both sides are hashed with the same algorithm, resolved once here.
+            hash_algo = resolve_hash_algo(self.config.get("HASH_ALGO", "sha256"), self.log_message.emit)
+
+            # If the remote copy is untouched since it was last verified and the local
+            # vault still has the same hash, the upload and remote re-read can be skipped.
+            # The mtime of the vault alone is not enough: VeraCrypt preserves it by default.
+            # Its ctime still changes, so a vault with a new size or ctime was written to and
+            # is copied straight away instead of being read once just to refuse the skip.
+            # The stat is taken before the copy, so changes made during it are seen next time.
+            local_stat = os.stat(veracrypt_vault)
+            local_signature = [local_stat.st_size, local_stat.st_ctime_ns]
+            last_verified = load_verified_uploads().get(dest_file_path)
+            if (last_verified and last_verified.get("HASH_ALGO") == hash_algo
+                    and last_verified.get("LOCAL") == local_signature):
+                dest_stat = self._stat_remote(dest_file_path)
+                if dest_stat == (last_verified.get("SIZE"), last_verified.get("MTIME")):
+                    source_hash = calculate_sha256_shani(
+                        veracrypt_vault,
+                        status_update_callback=self.status_update.emit,
+                        cancellation_check_callback=lambda: self._cancellation_requested,
+                        hash_algo=hash_algo
+                    )
+                    if source_hash == last_verified.get("HASH"):
+                        self.log_message.emit("Vault is unchanged since the last verified upload (same hash, remote copy untouched). Skipping copy.")
+                        return
+
+            # Copy the vault and hash the source in a single read pass.
+            source_hash = copy_and_hash_source(
                 veracrypt_vault,
                 dest_file_path,
                 status_update_callback=self.status_update.emit,
                 cancellation_check_callback=lambda: self._cancellation_requested,
                 log_callback=self.log_message.emit,
                 io_timeout=self.io_timeout,
-                progress_callback=self.progress_update.emit
-            )
-
-            source_hash = calculate_sha256_local(
-                veracrypt_vault,
-                status_update_callback=self.status_update.emit,
-                cancellation_check_callback=lambda: self._cancellation_requested
+                progress_callback=self.progress_update.emit,
+                hash_algo=hash_algo,
+                chunk_size=self.io_chunk
             )
+            # The destination must still be read back to detect corruption in transit.
             dest_hash = calculate_sha256_with_watchdog(
                 dest_file_path,
                 status_update_callback=self.status_update.emit,
                 cancellation_check_callback=lambda: self._cancellation_requested,
                 log_callback=self.log_message.emit,
                 io_timeout=self.io_timeout,
-                progress_callback=self.progress_update.emit
-            ) 
+                progress_callback=self.progress_update.emit,
+                hash_algo=hash_algo,
+                chunk_size=self.io_chunk
+            )
             if not (source_hash and dest_hash and source_hash == dest_hash):
-                self._emit_main_status_change(StatusCodes.VERIFICATION_FAILED, "The SHA256 hashes of the source and destination files do not match.")
+                self._emit_main_status_change(StatusCodes.VERIFICATION_FAILED, f"The {hash_algo.upper()} hashes of the source and destination files do not match.")
                 try:
                     os.remove(dest_file_path)
                     self.log_message.emit("The corrupt destination file has been deleted.")
                 except OSError as e:
                     self.log_message.emit(f"ERROR: Could not delete corrupt file: {e}")
+            else:
+                self._record_verified_upload(dest_file_path, source_hash, hash_algo, local_signature)
 
         except CancellationError as e:
             self.log_message.emit(f"--- {e} ---") # Log the cancellation message
@@ -420,8 +594,9 @@ class BackupWorker(QObject):
 
             if mount_point:
                 self.log_message.emit("Ensuring vault is unmounted after an issue...")
-                dismount_command = ["veracrypt", "--text", "--non-interactive", "--dismount", mount_point]
+                dismount_command = veracrypt_command("--dismount", mount_point)
                 run_command(dismount_command, sudo_password=self.sudo_password, log_callback=self.log_message.emit)
+                invalidate_mount_cache()
             self.finished.emit()
 
 
@@ -440,12 +615,22 @@ class VaultActionWorker(QObject):
         self.profile = profile
         self.sudo_password = sudo_password
 
+    @Slot(str, object, object, str)
+    def run_action(self, mode, config, profile, sudo_password):
+        """
+        Runs an action with the given settings. MainWindow keeps one worker on a
+        long-lived thread and queues actions to it through this slot.
+        """
+        self.config = config
+        self.profile = profile
+        self.sudo_password = sudo_password
+        self.run(mode)
+
     @Slot(str)
     def run(self, mode):
         """The main entry point for the worker's actions."""
-        home_dir = os.path.expanduser('~')
         vault_path_relative = self.profile.get("VERACRYPT_VAULT", "")
-        vault_path = os.path.join(home_dir, vault_path_relative) if vault_path_relative else ""
+        vault_path = os.path.join(HOME_DIR, vault_path_relative) if vault_path_relative else ""
 
         # Retrieve password from keyring
         veracrypt_password = get_veracrypt_password(vault_path_relative)
@@ -454,8 +639,7 @@ class VaultActionWorker(QObject):
             self.finished.emit()
             return
 
-        base_command = ["veracrypt", "--text", "--non-interactive"]
-        mount_point = get_mount_point(vault_path, self.sudo_password)
+        mount_point = cached_get_mount_point(vault_path, self.sudo_password)
 
         if mode == "CHECK_STATUS":
             self.status_updated.emit(mount_point is not None)
@@ -463,15 +647,19 @@ class VaultActionWorker(QObject):
         elif mode == "TOGGLE_MOUNT":
             if mount_point: # Unmount
                 self.log_message.emit("--- Unmounting vault... ---")
-                cmd = base_command + ["--dismount", mount_point]
-                run_command(cmd, sudo_password=self.sudo_password, log_callback=self.log_message.emit)
+                cmd = veracrypt_command("--dismount", mount_point)
+                process = run_command(cmd, sudo_password=self.sudo_password, log_callback=self.log_message.emit)
+                invalidate_mount_cache()
+                # A successful dismount means there is no mount point; no need to ask veracrypt again.
+                new_mount_point = None if process else mount_point
             else: # Mount
                 self.log_message.emit("--- Mounting vault... ---")
-                args = ["--mount", vault_path, "--password", veracrypt_password]
-                cmd = base_command + args
-                run_command(cmd, sudo_password=self.sudo_password, log_callback=self.log_message.emit)
-            
-            new_mount_point = get_mount_point(vault_path, self.sudo_password)
+                cmd = veracrypt_command("--mount", vault_path, "--password", veracrypt_password)
+                process = run_command(cmd, sudo_password=self.sudo_password, log_callback=self.log_message.emit)
+                invalidate_mount_cache()
+                # Only a successful mount needs a lookup, to find the new mount point.
+                new_mount_point = cached_get_mount_point(vault_path, self.sudo_password) if process else mount_point
+
             if mount_point and not new_mount_point:
                 self.log_message.emit("Unmount successful.")
             elif not mount_point and new_mount_point:
@@ -488,19 +676,52 @@ class VaultActionWorker(QObject):
                 return
             self.log_message.emit("--- Emptying vault... ---")
             try:
-                for filename in os.listdir(mount_point):
-                    file_path = os.path.join(mount_point, filename)
-                    if os.path.isfile(file_path) or os.path.islink(file_path):
-                        os.unlink(file_path)
-                    elif os.path.isdir(file_path):
-                        shutil.rmtree(file_path)
-                self.log_message.emit("Vault emptied successfully.")
+                # A single 'find -delete' removes everything below the mount point
+                # (without following symlinks) in one process instead of a Python loop.
+                cmd = ["find", mount_point, "-mindepth", "1", "-delete"]
+                if run_command(cmd, log_callback=self.log_message.emit) is None:
+                    self.log_message.emit("ERROR: Failed to empty vault. See the output above.")
+                else:
+                    self.log_message.emit("Vault emptied successfully.")
             except Exception as e:
                 self.log_message.emit(f"ERROR: Failed to empty vault: {e}")
         
         self.finished.emit()
 
+class VaultSizeSignals(QObject):
+    size_ready = Signal(str, str)  # Emits vault_path, formatted size (e.g. " (1.50 GB)") or ""
+
+
+class VaultSizeTask(QRunnable):
+    """
+    Looks up the size of the vault file on a thread pool thread, since stat() can
+    block for a while if the vault lives on a slow or network drive.
+    """
+    def __init__(self, vault_path):
+        super().__init__()
+        self.vault_path = vault_path
+        self.signals = VaultSizeSignals()
+
+    def run(self):
+        vault_size_str = ""
+        try:
+            # A single stat() both checks that the vault exists and gets its size.
+            size_bytes = os.stat(self.vault_path).st_size
+            if size_bytes > 1024 * 1024 * 1024: # GB
+                size_str = f"{size_bytes / (1024**3):.2f} GB"
+            elif size_bytes > 1024 * 1024: # MB
+                size_str = f"{size_bytes / (1024**2):.2f} MB"
+            else: # KB
+                size_str = f"{size_bytes / 1024:.2f} KB"
+            vault_size_str = f" ({size_str})"
+        except OSError:
+            vault_size_str = "" # Fail silently if missing, on permission errors etc.
+        self.signals.size_ready.emit(self.vault_path, vault_size_str)
+
+
 class MainWindow(QWidget):
+    vault_action_requested = Signal(str, object, object, str)  # Emits mode, config, profile, sudo_password
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Google Drive Backup")
@@ -630,25 +851,13 @@ class MainWindow(QWidget):
 
 
         # --- Bottom Details Panel (collapsible) ---
-        self.details_panel = QWidget()
-        details_layout = QVBoxLayout(self.details_panel)
-        details_layout.setContentsMargins(5, 5, 5, 5)
-
-        self.log_box = QPlainTextEdit()
-        self.log_box.setReadOnly(True)
-        log_font = QFont("Monospace")
-        log_font.setStyleHint(QFont.TypeWriter)
-        log_font.setPointSize(9) # A smaller font size fits more columns
-        self.log_box.setFont(log_font)
-        self.log_box.setLineWrapMode(QPlainTextEdit.WidgetWidth)
-
-        details_layout.addWidget(self.log_box)
-        self.details_panel.setVisible(False) # Start collapsed
-        self.details_panel.setFixedHeight(400)
+        # Built by _build_details_panel the first time it is shown; most runs never open it.
+        self.details_panel = None
+        self.log_box = None
 
         # --- Assemble Main Window ---
         main_layout.addWidget(control_panel)
-        main_layout.addWidget(self.details_panel)
+        self.main_layout = main_layout
 
         # --- Threading ---
         self.thread = None
@@ -660,23 +869,52 @@ class MainWindow(QWidget):
         self.current_backup_step = ""
         self.last_status_code = ""
         self.is_first_run = False # Flag for initial setup
-        self.is_backup_running = False # Track if the backup thread is active
+        self.is_backup_running = False # Track if a run is in progress (password check or backup thread)
+        self.is_verifying_password = False # The sudo password is being checked; no worker exists yet
+        self._closing = False # Set once the window starts closing; late callbacks are ignored
         self.countdown_seconds = 0
         self._close_on_finish = False # Flag to close after backup stops
-        self.close_timer = QTimer(self)
+        self._close_button_mode = "close" # See _set_close_button_mode
+        self.close_timer = QTimer(self) # Ticks once a second to update the countdown label
+        # Closes the window when the countdown runs out. Kept separate from the label
+        # ticks so the close happens on time even if ticks are delayed.
+        self.auto_close_timer = QTimer(self)
+        self.auto_close_timer.setSingleShot(True)
+        self._countdown_end = 0.0
+        self._vault_size_path = None
+        self._vault_label_mounted = False
+        self._vault_name = ""
+        self._build_vault_labels("")
+        # Log messages are buffered and added to the log box in one go, so that a
+        # burst of worker output causes one layout pass instead of one per message.
+        self._log_buffer = collections.deque(maxlen=LOG_MAX_BLOCKS)
+        self._log_flush_timer = QTimer(self)
+        self._log_flush_timer.setSingleShot(True)
+        self._log_flush_timer.setInterval(LOG_FLUSH_INTERVAL_MS)
+        self._log_flush_timer.timeout.connect(self._flush_log)
+
+        # A single worker thread handles all vault actions (status checks, mount, empty).
+        self.vault_thread = QThread(self)
+        self.vault_worker = VaultActionWorker(None, None)
+        self.vault_worker.moveToThread(self.vault_thread)
+        self.vault_worker.log_message.connect(self.append_log)
+        self.vault_worker.status_updated.connect(self._on_vault_status_updated)
+        self.vault_worker.finished.connect(self._on_vault_action_finished)
+        self.vault_action_requested.connect(self.vault_worker.run_action)
+        self.vault_thread.start()
 
         # --- Connections ---
         self.settings_button.clicked.connect(self.open_settings)
 
         # Add Ctrl+S shortcut for opening settings
         open_settings_action = QAction("Open Settings", self)
-        open_settings_action.setShortcut(QKeySequence("Ctrl+S"))
+        open_settings_action.setShortcut(QKeySequence(Qt.CTRL | Qt.Key_S))
         open_settings_action.triggered.connect(self.open_settings)
         self.addAction(open_settings_action)
 
         # Add Ctrl+Q shortcut for quitting
         quit_action = QAction("Quit Application", self)
-        quit_action.setShortcut(QKeySequence("Ctrl+Q"))
+        quit_action.setShortcut(QKeySequence(Qt.CTRL | Qt.Key_Q))
         quit_action.triggered.connect(self.quit_application)
         self.addAction(quit_action)
 
@@ -686,6 +924,7 @@ class MainWindow(QWidget):
         self.mount_button.clicked.connect(self.on_mount_button_clicked)
         self.empty_vault_button.clicked.connect(self.on_empty_vault_button_clicked)
         self.close_timer.timeout.connect(self.update_countdown)
+        self.auto_close_timer.timeout.connect(self.close)
 
         # Set the initial fixed size for the window (control panel only)
         self.setFixedSize(1200, 450)
@@ -769,17 +1008,17 @@ class MainWindow(QWidget):
         self.is_backup_running = True
 
         self.close_timer.stop()
-        self.close_button.setText("Close")
+        self.auto_close_timer.stop()
 
         self.action_button_widget.setVisible(False)
 
-        # Change close button to Stop button during backup
-        self.close_button.setText("Stop")
-        self.close_button.setEnabled(True)
+        # The close button becomes a Stop button once the worker starts. Until then
+        # (password prompt and check) there is nothing to stop yet.
+        self._set_close_button_mode("close")
+        self.close_button.setEnabled(False)
         self.backup_button.setVisible(False) # Hide the "Try Again" button when a run starts
 
         # --- Pre-flight check for sudo password ---
-        sudo_password = None
         # Use the new utility function to check the state
         if is_password_required():
             password, ok = QInputDialog.getText(
@@ -789,31 +1028,47 @@ class MainWindow(QWidget):
             )
             if not ok:  # User cancelled
                 # Reset the UI to its idle state before returning
-                self.close_button.setEnabled(True)
+                self.is_backup_running = False
+                self._set_close_button_mode("close")
                 self.backup_button.setVisible(True)
                 return
 
             # Verify the password before proceeding to avoid passing a bad password
             # to the worker thread, which can cause complex failures.
-            if not verify_sudo_password(password):
-                QMessageBox.warning(self, "Incorrect Password", "The system password you entered was incorrect. Backup aborted.")
-                self.close_button.setEnabled(True)
-                self.backup_button.setVisible(True)
-                return
-
-            sudo_password = password
+            # sudo runs asynchronously so the window keeps repainting meanwhile.
+            self.status_label.setText("Verifying system password...")
+            self.is_verifying_password = True
+            verify_sudo_password_async(password, self, lambda ok: self._on_sudo_password_verified(ok, password))
         else:
             # Passwordless sudo is configured, so we pass an empty string to the worker.
-            sudo_password = ""
+            self._start_backup_worker("")
+
+    def _on_sudo_password_verified(self, ok, password):
+        """Continues run_backup_process once the sudo password has been checked."""
+        self.is_verifying_password = False
+        if self._closing:
+            # The window was closed while sudo was running; don't start a backup behind it.
+            self.is_backup_running = False
+            return
+        if not ok:
+            self.is_backup_running = False
+            QMessageBox.warning(self, "Incorrect Password", "The system password you entered was incorrect. Backup aborted.")
+            self._set_close_button_mode("close")
+            self.backup_button.setVisible(True)
+            return
+        self._start_backup_worker(password)
 
+    def _start_backup_worker(self, sudo_password):
+        """Starts the backup worker thread, once any sudo password has been verified."""
         self.last_sudo_password = sudo_password
-        self.log_box.clear()
+        self._clear_log()
         self.status_label.setText("Starting backup process...")
         self.progress_bar.setVisible(False)
         self.progress_bar.setValue(0)
 
         if not self.config:
             # Config failed to load in __init__, so we can't proceed.
+            self.is_backup_running = False
             return # Error is already displayed.
 
         self._update_info_labels()
@@ -840,11 +1095,7 @@ class MainWindow(QWidget):
         self.thread.finished.connect(self.thread.deleteLater)
 
         # Connect stop button functionality during backup
-        try:
-            self.close_button.clicked.disconnect()
-        except RuntimeError:
-            pass # Already disconnected
-        self.close_button.clicked.connect(self.on_stop_clicked)
+        self._set_close_button_mode("stop")
 
         self.thread.start()
 
@@ -854,10 +1105,17 @@ class MainWindow(QWidget):
         """Keeps track of the worker's current step."""
         self.current_backup_step = step_name
 
-    @Slot()
-    def on_settings_saved(self):
-        """Called when settings are saved or imported to refresh the UI."""
-        self.config, error_msg = load_config()
+    @Slot(object)
+    def on_settings_saved(self, new_config=None):
+        """
+        Called when settings are saved or imported to refresh the UI.
+        new_config is the config that was just saved; if None, it is loaded from disk.
+        """
+        if new_config is None:
+            self.config, error_msg = load_config()
+        else:
+            error_msg = validate_config(new_config)
+            self.config = None if error_msg else new_config
         if error_msg:
             self.update_main_status(StatusCodes.CONFIG_ERROR, f"Failed to reload config: {error_msg}")
             return
@@ -873,39 +1131,74 @@ class MainWindow(QWidget):
             return
 
         vault_relative_path = self.current_profile.get("VERACRYPT_VAULT", "N/A")
-        vault_name = os.path.basename(vault_relative_path)
-        self.vault_info_label.setProperty("vault_name", vault_name) # Store for styling
+        self._vault_name = os.path.basename(vault_relative_path)
         gdrive_dir = self.config.get("GOOGLE_DRIVE_BACKUP_DIR", "N/A")
 
-        # Get and format the vault size
-        vault_full_path = os.path.join(os.path.expanduser('~'), vault_relative_path)
-        vault_size_str = ""
-        if os.path.exists(vault_full_path):
-            try:
-                size_bytes = os.path.getsize(vault_full_path)
-                if size_bytes > 1024 * 1024 * 1024: # GB
-                    size_str = f"{size_bytes / (1024**3):.2f} GB"
-                elif size_bytes > 1024 * 1024: # MB
-                    size_str = f"{size_bytes / (1024**2):.2f} MB"
-                else: # KB
-                    size_str = f"{size_bytes / 1024:.2f} KB"
-                vault_size_str = f" ({size_str})"
-            except OSError:
-                vault_size_str = "" # Fail silently on permission errors etc.
-        
-        self.vault_info_label.setProperty("vault_size", vault_size_str) # Store for styling
+        # The size is filled in by _on_vault_size_ready once the background lookup finishes.
+        self._vault_size_path = os.path.join(HOME_DIR, vault_relative_path)
+        size_task = VaultSizeTask(self._vault_size_path)
+        size_task.signals.size_ready.connect(self._on_vault_size_ready)
+        QThreadPool.globalInstance().start(size_task)
+
+        self._build_vault_labels("")
         self._apply_vault_label_style() # Apply default (unmounted) style
         self.dest_info_label.setText(f"to: Google Drive / {gdrive_dir}")
 
+    @Slot(str, str)
+    def _on_vault_size_ready(self, vault_path, vault_size_str):
+        """Shows the vault size looked up by VaultSizeTask."""
+        if vault_path != self._vault_size_path:
+            return # The profile changed while the size was being looked up.
+        self._build_vault_labels(vault_size_str)
+        self._apply_vault_label_style(self._vault_label_mounted)
+
+    def _build_vault_labels(self, vault_size_str):
+        """Prepares the unmounted and mounted texts of the vault name label."""
+        text = f"{self._vault_name}{vault_size_str}"
+        self._vault_label_unmounted = f"Crypt: {text}"
+        self._vault_label_mounted_html = f"Crypt: <span style='color: #2E7D32; font-weight: bold;'>{text}</span>"
+
+    def _build_details_panel(self):
+        """Creates the (initially hidden) details panel with the log box."""
+        self.details_panel = QWidget()
+        details_layout = QVBoxLayout(self.details_panel)
+        details_layout.setContentsMargins(5, 5, 5, 5)
+
+        self.log_box = QPlainTextEdit()
+        self.log_box.setReadOnly(True)
+        log_font = QFont("Monospace")
+        log_font.setStyleHint(QFont.TypeWriter)
+        log_font.setPointSize(9) # A smaller font size fits more columns
+        self.log_box.setFont(log_font)
+        self.log_box.setLineWrapMode(QPlainTextEdit.WidgetWidth)
+        # Keep long backups from slowing down the log: drop the oldest lines past the
+        # limit, and don't keep an undo history for a read-only widget.
+        self.log_box.setMaximumBlockCount(LOG_MAX_BLOCKS)
+        self.log_box.setUndoRedoEnabled(False)
+        # Appends go straight into the document through one long-lived cursor.
+        self._log_cursor = QTextCursor(self.log_box.document())
+
+        details_layout.addWidget(self.log_box)
+        self.details_panel.setVisible(False) # Start collapsed
+        self.details_panel.setFixedHeight(400)
+        self.main_layout.addWidget(self.details_panel)
+
+    def _details_visible(self):
+        """True if the details panel has been built and is currently shown."""
+        return self.details_panel is not None and not self.details_panel.isHidden()
+
     @Slot()
     def toggle_details(self):
         """Shows or hides the detailed log panel."""
+        if self.details_panel is None:
+            self._build_details_panel()
         is_hidden = self.details_panel.isHidden()
         self.details_panel.setVisible(is_hidden)
         if is_hidden:
             self.toggle_details_button.setArrowType(Qt.UpArrow)
             self.toggle_details_button.setText("Hide Details")
             self.setFixedSize(1200, 450 + 400) # control_panel + details_panel height
+            self._flush_log() # Catch up on messages logged while the panel was hidden
         else:
             self.toggle_details_button.setArrowType(Qt.DownArrow)
             self.toggle_details_button.setText("Show Details")
@@ -918,79 +1211,86 @@ class MainWindow(QWidget):
 
     @Slot(str)
     def append_log(self, message):
-        """Appends a message to the log box."""
-        self.log_box.appendPlainText(message)
+        """
+        Queues a message for the log box. Queued messages are added by _flush_log.
+        While the details panel is hidden they just stay queued (keeping the newest
+        LOG_MAX_BLOCKS), and are added when the panel is shown.
+        """
+        self._log_buffer.append(message)
+        if not self._log_flush_timer.isActive() and self._details_visible():
+            self._log_flush_timer.start()
+
+    def _flush_log(self):
+        """Appends all queued log messages to the log box at once."""
+        if not self._log_buffer or not self._details_visible():
+            return
+        text = "\n".join(self._log_buffer)
+        self._log_buffer.clear()
+
+        scroll_bar = self.log_box.verticalScrollBar()
+        at_bottom = scroll_bar.value() == scroll_bar.maximum()
+        cursor = self._log_cursor
+        cursor.movePosition(QTextCursor.End)
+        cursor.beginEditBlock()
+        if not self.log_box.document().isEmpty():
+            cursor.insertBlock()
+        cursor.insertText(text)
+        cursor.endEditBlock()
+        # Like appendPlainText, only follow the output if the user hasn't scrolled up.
+        if at_bottom:
+            scroll_bar.setValue(scroll_bar.maximum())
+
+    def _clear_log(self):
+        """Clears the log box along with any messages still queued for it."""
+        self._log_buffer.clear()
+        if self.log_box is not None:
+            self.log_box.clear()
+
+    # Status colors
+    COLOR_GREEN = "#4CAF50"
+    COLOR_ORANGE = "#FFA000"
+    COLOR_RED = "#D32F2F"
+
+    # status_code: (status text, color, default detail)
+    STATUS_TEMPLATES = {
+        # Positive/Neutral States
+        StatusCodes.IDLE: ("IDLE", COLOR_GREEN, "Click 'Backup' to start."),
+        StatusCodes.NEEDS_CONFIG: ("NEEDS CONFIG", COLOR_ORANGE, "Welcome! Please configure the application to begin."),
+        StatusCodes.RUNNING: ("RUNNING", COLOR_ORANGE, "Backup in progress..."),
+        StatusCodes.COMPLETE: ("COMPLETE", COLOR_GREEN, "All operations complete."),
+        StatusCodes.STOPPED: ("STOPPED", COLOR_ORANGE, "Backup was stopped by user request."),
+        # Error States
+        StatusCodes.CONFIG_ERROR: ("CONFIG ERROR", COLOR_RED, "Configuration Error: "),
+        StatusCodes.GDRIVE_NOT_MOUNTED: ("Error: Google Drive Not Mounted?", COLOR_RED, "The path is not responding. Please check that Google Drive is mounted."),
+        StatusCodes.GDRIVE_WRITE_FAILED: ("Error: Failed to write to Google Drive", COLOR_RED, "A file operation failed. Check permissions and path in the details log."),
+        StatusCodes.PERMISSION_DENIED: ("Error: Permission Denied", COLOR_RED, "Access was denied. Check file/folder permissions."),
+        StatusCodes.DISK_FULL: ("Error: Disk Full", COLOR_RED, "Insufficient disk space to complete the operation."),
+        StatusCodes.NETWORK_ERROR: ("Error: Network Issue", COLOR_RED, "Network connection failed. Check your internet connection."),
+        StatusCodes.VERIFICATION_FAILED: ("Error: Verification Failed", COLOR_RED, "The remote file is corrupt. The backup will be attempted again on the next run."),
+        StatusCodes.GENERAL_ERROR: ("ERROR", COLOR_RED, "An unexpected error occurred."),
+    }
+    # Statuses whose detail text includes the details passed to get_status_info.
+    # The others always show their default detail.
+    STATUS_DETAIL_FORMATS = {
+        StatusCodes.IDLE: "{}",
+        StatusCodes.CONFIG_ERROR: "Configuration Error: {}",
+        StatusCodes.GENERAL_ERROR: "CRITICAL ERROR: {}",
+    }
 
     def get_status_info(self, status_code, details=""):
         """Maps status codes to user-friendly messages and styles."""
-        # Define colors
-        COLOR_GREEN = "#4CAF50"
-        COLOR_ORANGE = "#FFA000"
-        COLOR_RED = "#D32F2F"
-
-        status_map = {
-            # Positive/Neutral States
-            StatusCodes.IDLE: {
-                'status': "IDLE", 'color': COLOR_GREEN,
-                'detail': details or "Click 'Backup' to start."
-            },
-            StatusCodes.NEEDS_CONFIG: {
-                'status': "NEEDS CONFIG", 'color': COLOR_ORANGE,
-                'detail': "Welcome! Please configure the application to begin."
-            },
-            StatusCodes.RUNNING: {
-                'status': "RUNNING", 'color': COLOR_ORANGE,
-                'detail': "Backup in progress..."
-            },
-            StatusCodes.COMPLETE: {
-                'status': "COMPLETE", 'color': COLOR_GREEN,
-                'detail': "All operations complete."
-            },
-            StatusCodes.STOPPED: {
-                'status': "STOPPED", 'color': COLOR_ORANGE,
-                'detail': "Backup was stopped by user request."
-            },
-            # Error States
-            StatusCodes.CONFIG_ERROR: {
-                'status': "CONFIG ERROR", 'color': COLOR_RED,
-                'detail': f"Configuration Error: {details}"
-            },
-            StatusCodes.GDRIVE_NOT_MOUNTED: {
-                'status': "Error: Google Drive Not Mounted?", 'color': COLOR_RED,
-                'detail': "The path is not responding. Please check that Google Drive is mounted."
-            },
-            StatusCodes.GDRIVE_WRITE_FAILED: {
-                'status': "Error: Failed to write to Google Drive", 'color': COLOR_RED,
-                'detail': "A file operation failed. Check permissions and path in the details log."
-            },
-            StatusCodes.PERMISSION_DENIED: {
-                'status': "Error: Permission Denied", 'color': COLOR_RED,
-                'detail': "Access was denied. Check file/folder permissions."
-            },
-            StatusCodes.DISK_FULL: {
-                'status': "Error: Disk Full", 'color': COLOR_RED,
-                'detail': "Insufficient disk space to complete the operation."
-            },
-            StatusCodes.NETWORK_ERROR: {
-                'status': "Error: Network Issue", 'color': COLOR_RED,
-                'detail': "Network connection failed. Check your internet connection."
-            },
-            StatusCodes.VERIFICATION_FAILED: {
-                'status': "Error: Verification Failed", 'color': COLOR_RED,
-                'detail': "The remote file is corrupt. The backup will be attempted again on the next run."
-            },
-            StatusCodes.GENERAL_ERROR: {
-                'status': "ERROR", 'color': COLOR_RED,
-                'detail': f"CRITICAL ERROR: {details}" if details else "An unexpected error occurred."
-            }
-        }
-        return status_map.get(status_code, status_map[StatusCodes.GENERAL_ERROR])
+        if status_code not in self.STATUS_TEMPLATES:
+            status_code = StatusCodes.GENERAL_ERROR
+        status, color, detail = self.STATUS_TEMPLATES[status_code]
+        if details and status_code in self.STATUS_DETAIL_FORMATS:
+            detail = self.STATUS_DETAIL_FORMATS[status_code].format(details)
+        return {'status': status, 'color': color, 'detail': detail}
 
     @Slot(str)
     def update_status(self, text):
         """Updates the main status label and appends to the log."""
         self.status_label.setText(text)
-        self.log_box.appendPlainText(f"--- {text}")
+        self.append_log(f"--- {text}")
     
     @Slot(int)
     def update_progress(self, percentage):
@@ -1006,14 +1306,17 @@ class MainWindow(QWidget):
         status_info = self.get_status_info(status_code, details)
         
         self.running_status_label.setText(status_info['status'])
-        self.running_status_label.setStyleSheet(f"background-color: {status_info['color']}; color: white; border-radius: 5px;")
+        # setStyleSheet re-polishes the widget even if nothing changed, so only call it when needed.
+        style = f"background-color: {status_info['color']}; color: white; border-radius: 5px;"
+        if self.running_status_label.styleSheet() != style:
+            self.running_status_label.setStyleSheet(style)
         self.status_label.setText(status_info['detail'])
 
         # Also log critical errors
-        is_error = status_info['color'] == "#D32F2F"
+        is_error = status_info['color'] == self.COLOR_RED
         if is_error:
             log_text = details if details else status_info['detail']
-            self.log_box.appendPlainText(f"\n--- CRITICAL ERROR ---\n{log_text}")
+            self.append_log(f"\n--- CRITICAL ERROR ---\n{log_text}")
 
     @Slot()
     def on_worker_finished(self):
@@ -1022,20 +1325,15 @@ class MainWindow(QWidget):
         for UI state changes after a run (e.g., enabling/disabling buttons).
         """
         self.is_backup_running = False
+        self.worker = None # Deleted via deleteLater; a new one is made for each run
 
         # If a quit was requested, just close the app and skip all other UI updates.
-        if hasattr(self, '_close_on_finish') and self._close_on_finish:
+        if self._close_on_finish:
             self.close()
             return
 
-        self.close_button.setEnabled(True)
         # Hide progress bar when backup finishes
         self.progress_bar.setVisible(False)
-        # Disconnect any temporary handlers (like for auto-close) and reconnect the default.
-        try:
-            self.close_button.clicked.disconnect()
-        except RuntimeError:
-            pass # It might have been disconnected already
 
         # The status text and color are already set by update_main_status.
         # We just need to manage the buttons and auto-close timer.
@@ -1044,17 +1342,16 @@ class MainWindow(QWidget):
             self.countdown_seconds = self.config.get("AUTO_CLOSE_SECONDS", 5)
             # Only start the countdown if it's enabled AND the settings window is not open.
             if isinstance(self.countdown_seconds, int) and self.countdown_seconds > 0 and (not self.settings_window or not self.settings_window.isVisible()):
-                self.close_button.setText(f"Do Not Close ({self.countdown_seconds})")
-                self.close_button.clicked.connect(self.cancel_auto_close)
+                self._set_close_button_mode("countdown")
+                self._countdown_end = time.monotonic() + self.countdown_seconds
+                self.auto_close_timer.start(self.countdown_seconds * 1000)
                 self.close_timer.start(1000) # 1000 ms = 1 second
             else:
-                self.close_button.setText("Close")
-                self.close_button.clicked.connect(self.close)
+                self._set_close_button_mode("close")
         else:
             # This covers STOPPED and all ERROR cases.
             self.backup_button.setVisible(True) # Show the "Try Again" button.
-            self.close_button.setText("Close")
-            self.close_button.clicked.connect(self.close)
+            self._set_close_button_mode("close")
 
         # This is the crucial part: This is called ONCE, after the backup thread is finished.
         # It will start a new, short-lived thread to check the vault status.
@@ -1063,51 +1360,95 @@ class MainWindow(QWidget):
 
     @Slot()
     def update_countdown(self):
-        """Updates the close button timer each second."""
-        self.countdown_seconds -= 1
+        """Updates the close button label each second; auto_close_timer does the closing."""
+        self.countdown_seconds = round(self._countdown_end - time.monotonic())
         if self.countdown_seconds > 0:
             self.close_button.setText(f"Do Not Close ({self.countdown_seconds})")
         else:
             self.close_timer.stop()
-            self.close()
 
     @Slot()
     def on_stop_clicked(self):
         """Handles the Stop button click during backup."""
-        if hasattr(self, 'worker') and self.worker:
+        if self.worker is not None:
             self.worker.request_cancellation()
-            self.close_button.setText("Stopping...")
-            self.close_button.setEnabled(False)
-            self.log_box.appendPlainText("\n--- STOP REQUESTED ---\nBackup will stop at the next safe point...")
+            self._set_close_button_mode("stopping")
+            self.append_log("\n--- STOP REQUESTED ---\nBackup will stop at the next safe point...")
 
     @Slot()
     def cancel_auto_close(self):
         """Stops the auto-close timer and reverts the button to a normal 'Close' button."""
         self.close_timer.stop()
-        self.close_button.setText("Close")
+        self.auto_close_timer.stop()
+        self._set_close_button_mode("close")
+
+    # mode: (text, enabled, name of the clicked handler)
+    CLOSE_BUTTON_MODES = {
+        "close": ("Close", True, "close"),
+        "stop": ("Stop", True, "on_stop_clicked"),
+        "countdown": (None, True, "cancel_auto_close"), # Text is kept up to date by update_countdown
+        "stopping": ("Stopping...", False, None),
+        "quitting": ("Quitting...", False, None),
+    }
+
+    def _set_close_button_mode(self, mode):
+        """
+        Sets the close button's text, enabled state and click handler for one of
+        CLOSE_BUTTON_MODES. Only the enabled state is reapplied if the mode is unchanged.
+        """
+        text, enabled, handler = self.CLOSE_BUTTON_MODES[mode]
+        self.close_button.setEnabled(enabled)
+        if mode == self._close_button_mode:
+            return
+
+        if self._close_button_mode == "countdown":
+            # Undo the fixed width set for the countdown.
+            self.close_button.setMinimumWidth(0)
+            self.close_button.setMaximumWidth(QWIDGETSIZE_MAX)
+        self._close_button_mode = mode
+
         try:
             self.close_button.clicked.disconnect()
         except RuntimeError:
-            pass
-        self.close_button.clicked.connect(self.close)
+            pass # Nothing was connected
+        if handler:
+            self.close_button.clicked.connect(getattr(self, handler))
+
+        if mode == "countdown":
+            self.close_button.setText(f"Do Not Close ({self.countdown_seconds})")
+            # Hold the width while the countdown runs so the label updates never
+            # resize the button and re-layout the footer.
+            self.close_button.setFixedWidth(self.close_button.sizeHint().width())
+        else:
+            self.close_button.setText(text)
 
     def close(self):
         """Stops any running timers and closes the application."""
         self.close_timer.stop()
+        self.auto_close_timer.stop()
         super().close()
 
+    def closeEvent(self, event):
+        """Stops the vault worker thread, letting any running action finish first."""
+        self._closing = True
+        if self.is_backup_running and self.worker is not None:
+            self.worker.request_cancellation()
+        self.vault_thread.quit()
+        self.vault_thread.wait()
+        super().closeEvent(event)
+
     @Slot()
     def quit_application(self):
         """Stops the backup if it's running, then closes the application."""
-        if self.is_backup_running:
+        if self.is_backup_running and self.worker is not None:
             # A backup is running. Request cancellation and set a flag to close when it's done.
             self._close_on_finish = True
             self.worker.request_cancellation()
-            self.close_button.setText("Quitting...")
-            self.close_button.setEnabled(False)
-            self.log_box.appendPlainText("\n--- QUIT REQUESTED ---\nBackup will stop at the next safe point, then the application will close.")
+            self._set_close_button_mode("quitting")
+            self.append_log("\n--- QUIT REQUESTED ---\nBackup will stop at the next safe point, then the application will close.")
         else:
-            # No backup running, just close immediately.
+            # No backup running (or only the password check, which closeEvent
+            # makes harmless), just close immediately.
             self.close()
 
     def _get_sudo_password_if_needed(self):
@@ -1135,22 +1476,13 @@ class MainWindow(QWidget):
         self.mount_button.setEnabled(False)
         self.empty_vault_button.setEnabled(False)
 
-        thread = QThread()
-        worker = VaultActionWorker(self.config, self.current_profile, sudo_password)
-        worker.moveToThread(thread)
+        # Actions are queued to the long-lived vault worker and run one at a time.
+        self.vault_action_requested.emit(mode, self.config, self.current_profile, sudo_password)
 
-        worker.log_message.connect(self.append_log)
-        worker.status_updated.connect(self._on_vault_status_updated)
-        worker.finished.connect(lambda: self.mount_button.setEnabled(True))
-        worker.finished.connect(lambda: self.empty_vault_button.setEnabled(True))
-        worker.finished.connect(thread.quit)
-        worker.finished.connect(worker.deleteLater)
-        thread.finished.connect(thread.deleteLater)
-
-        thread.started.connect(lambda: worker.run(mode))
-        thread.start()
-        # Keep a reference to the thread to prevent it from being garbage collected
-        self.action_thread = thread
+    @Slot()
+    def _on_vault_action_finished(self):
+        self.mount_button.setEnabled(True)
+        self.empty_vault_button.setEnabled(True)
 
     def _update_ui_for_idle_state(self, sudo_password=None):
         """Shows action buttons and triggers a status check."""
@@ -1186,14 +1518,9 @@ class MainWindow(QWidget):
             self.empty_vault_button.setEnabled(False)
 
     def _apply_vault_label_style(self, is_mounted=False):
-        """Applies rich text styling to the vault name label."""
-        vault_name = self.vault_info_label.property("vault_name") or ""
-        vault_size = self.vault_info_label.property("vault_size") or ""
-        if is_mounted:
-            html = f"Crypt: <span style='color: #2E7D32; font-weight: bold;'>{vault_name}{vault_size}</span>"
-            self.vault_info_label.setText(html)
-        else:
-            self.vault_info_label.setText(f"Crypt: {vault_name}{vault_size}")
+        """Shows the vault name label's mounted (rich text) or unmounted text."""
+        self._vault_label_mounted = is_mounted
+        self.vault_info_label.setText(self._vault_label_mounted_html if is_mounted else self._vault_label_unmounted)
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
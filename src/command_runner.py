@@ -1,19 +1,137 @@
+import os
+import time
+import shutil
+import selectors
+import threading
 import subprocess
+import functools
 import concurrent.futures
 
+READ_CHUNK_SIZE = 64 * 1024  # Bytes read from a pipe at a time
+
+IO_WORKERS = 2  # Threads in the shared pool used by run_with_timeout
+
+_io_executor = None
+_io_executor_lock = threading.Lock()
+
+def _get_io_executor():
+    """Returns the shared thread pool for run_with_timeout, creating it on first use."""
+    global _io_executor
+    with _io_executor_lock:
+        if _io_executor is None:
+            _io_executor = concurrent.futures.ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="gbacky-io")
+        return _io_executor
+
+def _discard_io_executor(executor):
+    """
+    Stops handing work to a pool after one of its calls timed out. The hung call
+    may never return and would block a worker, so later calls get a fresh pool.
+    """
+    global _io_executor
+    with _io_executor_lock:
+        if _io_executor is executor:
+            _io_executor = None
+    executor.shutdown(wait=False)
+
+@functools.lru_cache(maxsize=None)
+def cached_which(cmd):
+    """
+    Cached shutil.which, since PATH is not expected to change during a session.
+    Call cached_which.cache_clear() after a miss, so a freshly installed tool is found.
+    """
+    return shutil.which(cmd)
+
 def run_with_timeout(func, args=(), kwargs={}, timeout=30):
     """Runs a function in a thread with a timeout, raising TimeoutError if it hangs."""
     if timeout is None:
         # No timeout - run directly
         return func(*args, **kwargs)
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
-        future = executor.submit(func, *args, **kwargs)
-        try:
-            return future.result(timeout=timeout)
-        except concurrent.futures.TimeoutError:
-            raise TimeoutError(f"Operation '{func.__name__}' timed out after {timeout}s.")
+    started = threading.Event()
+    def task():
+        started.set()
+        return func(*args, **kwargs)
 
+    # The pool is shared so the copy and hash loops don't start a thread for every chunk.
+    executor = _get_io_executor()
+    future = executor.submit(task)
+    try:
+        # The clock starts once the call is running, so time spent queued behind
+        # other calls doesn't count against its timeout. A call that can't even
+        # start within the timeout means every worker is hung.
+        if not started.wait(timeout):
+            raise concurrent.futures.TimeoutError()
+        return future.result(timeout=timeout)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        _discard_io_executor(executor)
+        raise TimeoutError(f"Operation '{func.__name__}' timed out after {timeout}s.")
+
+
+class BatchingLogSink:
+    """
+    Collects log messages and passes them on to emit() as one joined string,
+    at most every max_interval seconds or max_lines lines. Emitting a Qt signal
+    per line floods the GUI thread's event queue on verbose commands.
+    Call flush() when done so the last lines aren't lost.
+    """
+    def __init__(self, emit, max_lines=64, max_interval=0.016):
+        self.emit = emit
+        self.max_lines = max_lines
+        self.max_interval = max_interval
+        self._buffer = []
+        self._line_count = 0
+        self._last_flush = time.monotonic()
+
+    def push(self, message):
+        self._buffer.append(message)
+        self._line_count += message.count('\n') + 1
+        if self._line_count >= self.max_lines or time.monotonic() - self._last_flush > self.max_interval:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self.emit('\n'.join(self._buffer))
+            self._buffer.clear()
+            self._line_count = 0
+        self._last_flush = time.monotonic()
+
+def _drain(process, on_stdout_lines=None):
+    """
+    Reads a running process's stdout and stderr until both pipes close, using a
+    selector and large os.read() chunks instead of per-line reads.
+    If on_stdout_lines is given, it is called with each batch of complete stdout
+    lines (as bytes) as soon as they arrive, and those lines are not kept.
+    Returns (stdout_bytes, stderr_bytes); stdout is empty if it was streamed.
+    """
+    stdout_fd = process.stdout.fileno()
+    buffers = {stdout_fd: bytearray(), process.stderr.fileno(): bytearray()}
+
+    with selectors.DefaultSelector() as selector:
+        selector.register(process.stdout, selectors.EVENT_READ)
+        selector.register(process.stderr, selectors.EVENT_READ)
+        while selector.get_map():
+            for key, _ in selector.select():
+                chunk = os.read(key.fd, READ_CHUNK_SIZE)
+                if not chunk:
+                    selector.unregister(key.fileobj)
+                    continue
+                buffer = buffers[key.fd]
+                buffer += chunk
+                if on_stdout_lines and key.fd == stdout_fd:
+                    # Hand over the complete lines and keep only the partial last one,
+                    # so verbose output never piles up in memory.
+                    end = buffer.rfind(b'\n') + 1
+                    if end:
+                        on_stdout_lines(buffer[:end].splitlines())
+                        del buffer[:end]
+
+    stdout = buffers[stdout_fd]
+    if on_stdout_lines and stdout:
+        on_stdout_lines(stdout.splitlines())  # Last line without a trailing newline
+        stdout.clear()
+    process.wait()
+    return bytes(stdout), bytes(buffers[process.stderr.fileno()])
 
 def run_command(command, sudo_password=None, log_callback=None, output_filter=None):
     """
@@ -25,68 +143,95 @@ def run_command(command, sudo_password=None, log_callback=None, output_filter=No
             passwordless sudo is assumed. If None, sudo is not used.
         log_callback (callable, optional): A function to call with log messages.
         output_filter (callable, optional): A function to process stdout lines.
+            Filtered lines are logged while the command runs, one log_callback
+            call per read from the pipe (see BatchingLogSink for batching by time).
 
     Returns:
         subprocess.CompletedProcess: The process object on success, or None on failure.
     """
     full_command = list(command)
-    run_kwargs = {
-        'capture_output': True,
-        'text': True,
-        'check': False  # We check the return code manually to log output on failure
-    }
+    password_input = None
 
     if sudo_password is not None:  # An empty string means passwordless sudo
         sudo_prefix = ["sudo"]
         if sudo_password:  # A non-empty string is the password
             sudo_prefix.append("-S")
-            run_kwargs['input'] = sudo_password
+            password_input = sudo_password.encode()
         full_command = sudo_prefix + full_command
 
     def get_safe_command_str(cmd_list):
         """Creates a log-safe string from a command list, obscuring passwords."""
+        if '--password' not in cmd_list:
+            # Nothing to obscure, which is the common case.
+            return ' '.join(cmd_list)
+        # Replace the value that follows the '--password' argument.
         log_cmd_str = list(cmd_list)
-        try:
-            # Find the '--password' argument and replace the value that follows it.
-            pw_idx = log_cmd_str.index('--password')
-            if pw_idx + 1 < len(log_cmd_str):
-                log_cmd_str[pw_idx + 1] = "'********'"
-        except ValueError:
-            # '--password' not found, so no need to obscure anything.
-            pass
+        pw_idx = log_cmd_str.index('--password')
+        if pw_idx + 1 < len(log_cmd_str):
+            log_cmd_str[pw_idx + 1] = "'********'"
         return ' '.join(log_cmd_str)
 
     # Log the command safely, obscuring any passwords
     if log_callback:
         log_callback(f"-> Running: {get_safe_command_str(full_command)}")
 
+    filtered_lines = []
+    def flush_filtered_lines():
+        if filtered_lines:
+            log_callback('\n'.join(filtered_lines))
+            filtered_lines.clear()
+
+    def on_stdout_lines(lines):
+        """Applies the output filter to new stdout lines and logs them in one call."""
+        for line in lines:
+            if not line:
+                continue
+            # The filter should return the processed line or None to discard it.
+            processed_line = output_filter(line.decode(errors='replace'))
+            if processed_line:
+                filtered_lines.append(processed_line)
+        # Log what arrived right away, so slow commands still stream their output.
+        flush_filtered_lines()
+
+    stream_output = bool(log_callback and output_filter)
+
     try:
-        process = subprocess.run(full_command, **run_kwargs)
+        popen = subprocess.Popen(
+            full_command,
+            stdin=subprocess.PIPE if password_input is not None else None,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE
+        )
+        if password_input is not None:
+            # The password is tiny, so this cannot block on a full pipe.
+            try:
+                popen.stdin.write(password_input)
+                popen.stdin.close()
+            except BrokenPipeError:
+                pass  # The process exited without reading its input.
+        stdout, stderr = _drain(popen, on_stdout_lines if stream_output else None)
+        if stream_output:
+            flush_filtered_lines()
+        process = subprocess.CompletedProcess(
+            full_command, popen.returncode,
+            stdout.decode(errors='replace'), stderr.decode(errors='replace')
+        )
 
         if process.returncode != 0:
             if log_callback:
                 safe_cmd_str = get_safe_command_str(process.args)
+                # Streamed output has already been logged.
+                output = "(see above)" if stream_output else process.stdout.strip()
                 err_msg = (f"ERROR executing command: {safe_cmd_str}\n"
                            f"Return code: {process.returncode}\n"
-                           f"Output:\n{process.stdout.strip()}\n"
+                           f"Output:\n{output}\n"
                            f"Error Output:\n{process.stderr.strip()}")
                 log_callback(err_msg)
             return None
 
-        # On success, log stdout (if any), applying the filter.
-        if log_callback and process.stdout:
+        # On success, log stdout (if any). Filtered output was already logged while streaming.
+        if log_callback and process.stdout and not stream_output:
             output_to_log = process.stdout.strip()
-            if output_filter:
-                processed_lines = []
-                for line in output_to_log.split('\n'):
-                    if not line:
-                        continue
-                    # The filter should return the processed line or None to discard it.
-                    processed_line = output_filter(line)
-                    if processed_line:
-                        processed_lines.append(processed_line)
-                output_to_log = '\n'.join(processed_lines)
-
             if output_to_log:
                 log_callback(output_to_log)
 
@@ -1,14 +1,25 @@
 import os
 import json
+import functools
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # Optional: the standard json module is used instead.
+
+# A development checkout has the packaging script next to the sources. This can't
+# change while the app runs, so it is checked once at import.
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+_IS_DEV = os.path.exists(os.path.join(_SCRIPT_DIR, 'package_deb.py'))
 
 def is_dev_environment():
     """
     Checks if the application is running in a development environment.
     The check is based on the presence of the 'package_deb.py' script.
     """
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    return os.path.exists(os.path.join(script_dir, 'package_deb.py'))
+    return _IS_DEV
 
+@functools.lru_cache(maxsize=1)
 def get_config_dir():
     """
     Determines the appropriate config directory based on the environment.
@@ -18,31 +29,57 @@ def get_config_dir():
     else:
         return os.path.join(os.path.expanduser('~'), '.config', 'Gbacky')
 
+# Keys every configuration file, and its first vault profile, must have.
+REQUIRED_CONFIG_KEYS = ("GOOGLE_DRIVE_PATH", "GOOGLE_DRIVE_BACKUP_DIR", "VAULT_PROFILES")
+REQUIRED_PROFILE_KEYS = ("ID", "NAME", "VERACRYPT_VAULT", "BACKUP_DIRS")
+
+def validate_config(config):
+    """Checks that a configuration dictionary has the required keys. Returns an error message or None."""
+    if not isinstance(config, dict):
+        return "The configuration file must contain a JSON object."
+
+    for key in REQUIRED_CONFIG_KEYS:
+        if key not in config:
+            return f"Missing key '{key}' in configuration file."
+
+    if not isinstance(config["VAULT_PROFILES"], list) or not config["VAULT_PROFILES"]:
+        return "The 'VAULT_PROFILES' key must be a non-empty list in the configuration file."
+
+    # Validate the first profile to ensure it has the required keys
+    first_profile = config["VAULT_PROFILES"][0]
+    if not isinstance(first_profile, dict):
+        return "The first vault profile must be a JSON object."
+    for key in REQUIRED_PROFILE_KEYS:
+        if key not in first_profile:
+            return f"The first vault profile is missing the required key: '{key}'"
+
+    return None
+
+def _json_loads(data):
+    """Parses JSON from bytes, with orjson if it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)  # orjson.JSONDecodeError is a json.JSONDecodeError
+    return json.loads(data)
+
+def _json_dumps(obj):
+    """Serializes an object to indented JSON bytes, with orjson if it is installed."""
+    # orjson only indents by 2, so the fallback does too and the file looks the same either way.
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2).encode()
+
 def load_config():
     """Loads configuration from the JSON file and validates required keys."""
     config_path = os.path.join(get_config_dir(), 'config.json')
     if not os.path.exists(config_path):
         return None, f"Configuration file not found at '{config_path}'"
     try:
-        with open(config_path, 'r') as f:
-            config = json.load(f)
-
-        required_keys = [
-            "GOOGLE_DRIVE_PATH", "GOOGLE_DRIVE_BACKUP_DIR", "VAULT_PROFILES"
-        ]
-        for key in required_keys:
-            if key not in config:
-                return None, f"Missing key '{key}' in configuration file."
-
-        if not isinstance(config["VAULT_PROFILES"], list) or not config["VAULT_PROFILES"]:
-            return None, "The 'VAULT_PROFILES' key must be a non-empty list in the configuration file."
-
-        # Validate the first profile to ensure it has the required keys
-        first_profile = config["VAULT_PROFILES"][0]
-        required_profile_keys = ["ID", "NAME", "VERACRYPT_VAULT", "BACKUP_DIRS"]
-        for key in required_profile_keys:
-            if key not in first_profile:
-                return None, f"The first vault profile is missing the required key: '{key}'"
+        with open(config_path, 'rb') as f:
+            config = _json_loads(f.read())
+
+        error_msg = validate_config(config)
+        if error_msg:
+            return None, error_msg
 
         return config, None # Return config and no error
     except json.JSONDecodeError as e:
@@ -57,8 +94,41 @@ def save_config(config_data):
     try:
         # Ensure the config directory exists before trying to write to it.
         os.makedirs(config_dir, exist_ok=True)
-        with open(config_path, 'w') as f:
-            json.dump(config_data, f, indent=4)
+        with open(config_path, 'wb') as f:
+            f.write(_json_dumps(config_data))
+        return True, None
+    except IOError as e:
+        return False, f"Could not write to configuration file: {e}"
+
+VERIFIED_UPLOADS_FILE = 'verified_uploads.json'  # Kept apart from config.json; see save_verified_upload
+
+def load_verified_uploads():
+    """Returns the {dest_file_path: record} dict of verified uploads, or {} if there is none yet."""
+    path = os.path.join(get_config_dir(), VERIFIED_UPLOADS_FILE)
+    try:
+        with open(path, 'rb') as f:
+            records = _json_loads(f.read())
+    except (IOError, ValueError):  # Missing or unreadable: just verify everything again.
+        return {}
+    return records if isinstance(records, dict) else {}
+
+def save_verified_upload(dest_file_path, record):
+    """
+    Stores the verification record for one uploaded vault. This lives in its own state
+    file, because it is written from the backup thread while the GUI may be saving
+    config.json. The file is replaced atomically so it is never left half-written.
+    Returns (success, error_msg).
+    """
+    config_dir = get_config_dir()
+    path = os.path.join(config_dir, VERIFIED_UPLOADS_FILE)
+    records = load_verified_uploads()
+    records[dest_file_path] = record
+    try:
+        os.makedirs(config_dir, exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(_json_dumps(records))
+        os.replace(tmp_path, path)
         return True, None
     except IOError as e:
-        return False, f"Could not write to configuration file: {e}"
\ No newline at end of file
+        return False, f"Could not write to {path}: {e}"
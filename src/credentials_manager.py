@@ -1,9 +1,15 @@
 import os
+import functools
 import keyring
 import keyring.errors
 
 from config_utils import is_dev_environment
 
+# Passwords already fetched from the keyring this session, by vault path. Every
+# keyring lookup is a D-Bus round trip to the Secret Service.
+_password_cache = {}
+
+@functools.lru_cache(maxsize=1)  # Depends only on is_dev_environment()
 def get_service_name():
     """
     Determines the keyring service name based on the environment.
@@ -21,8 +27,13 @@ def get_veracrypt_password(vault_path):
     """
     if not vault_path:
         return None
+    if vault_path in _password_cache:
+        return _password_cache[vault_path]
     try:
-        return keyring.get_password(get_service_name(), vault_path)
+        password = keyring.get_password(get_service_name(), vault_path)
+        if password is not None:
+            _password_cache[vault_path] = password
+        return password
     except keyring.errors.NoKeyringError:
         # This occurs if no supported keyring backend is available.
         return None
@@ -36,6 +47,7 @@ def set_veracrypt_password(vault_path, password):
         if not vault_path:
             return False, "Vault path cannot be empty when saving a password."
         keyring.set_password(get_service_name(), vault_path, password)
+        _password_cache[vault_path] = password
         return True, None # Success, no error message
     except keyring.errors.NoKeyringError:
         return False, "No system keyring backend found. Please ensure you have a supported keyring service (like GNOME Keyring) installed and running."
@@ -51,6 +63,7 @@ def delete_veracrypt_password(vault_path):
     try:
         if not vault_path:
             return True, None # Nothing to delete
+        _password_cache.pop(vault_path, None)
         keyring.delete_password(get_service_name(), vault_path)
         return True, None
     except keyring.errors.PasswordDeleteError:
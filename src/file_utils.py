@@ -1,45 +1,255 @@
+import os
+import time
+import mmap
+import errno
+import queue
 import hashlib
+import threading
+import subprocess
+from contextlib import closing
 from command_runner import run_with_timeout
 
+try:
+    import blake3
+except ImportError:
+    blake3 = None  # Optional: only used when HASH_ALGO is set to "blake3".
+
+# External hashers, in order of preference. OpenSSL dispatches to the CPU's SHA
+# extensions (SHA-NI) when available, which is much faster than a Python loop.
+SHA256_COMMANDS = [
+    ["openssl", "dgst", "-sha256", "-r"],
+    ["sha256sum"],
+]
+
+# Bytes per read/write. Large chunks mean fewer syscalls and FUSE round trips on the
+# Google Drive mount (config: IO_CHUNK_BYTES).
+IO_CHUNK = 16 * 1024 * 1024
+# Largest single read or write on a watched (network) file. Chunks are moved in slices
+# of at most this size, so the watchdog sees progress well within its timeout on slow links.
+WATCHDOG_SLICE = 4 * 1024 * 1024
+WRITE_QUEUE_DEPTH = 2  # Chunks copy_file_with_watchdog may read ahead of its writer thread
+READ_AHEAD_DEPTH = 2   # Chunks the hashing functions may read ahead of the hasher
+_EOF = object()        # Marks the end of a _read_ahead stream
+
+# Filesystem types that are treated as remote, so copies to them keep the watchdog.
+REMOTE_FSTYPE_PREFIXES = ("fuse", "nfs", "cifs", "smb", "9p", "afs", "ceph", "gfs", "davfs")
+
 class CancellationError(Exception):
     """Custom exception for handling user-requested cancellations."""
     pass
 
-def copy_file_with_watchdog(src_path, dst_path, status_update_callback, cancellation_check_callback, log_callback, io_timeout=45, progress_callback=None):
+def _fadvise(f, advice):
+    """
+    Gives the kernel a page-cache hint (e.g. "POSIX_FADV_SEQUENTIAL") for a local file.
+    Does nothing on platforms without posix_fadvise; the hint is never required.
+    """
+    if hasattr(os, "posix_fadvise"):
+        try:
+            os.posix_fadvise(f.fileno(), 0, 0, getattr(os, advice))
+        except OSError:
+            pass
+
+def resolve_hash_algo(hash_algo, log_callback):
+    """
+    Returns the hash algorithm to use for verification. BLAKE3 is only used
+    if requested and the 'blake3' module is installed; otherwise SHA256.
+    """
+    if hash_algo == "blake3":
+        if blake3 is not None:
+            return "blake3"
+        log_callback("Warning: 'blake3' module not installed, falling back to SHA256.")
+    return "sha256"
+
+def new_hasher(hash_algo="sha256"):
+    """Creates a streaming hash object for the given algorithm."""
+    if hash_algo == "blake3":
+        # BLAKE3 can hash large chunks on several threads at once.
+        return blake3.blake3(max_threads=blake3.blake3.AUTO)
+    return hashlib.sha256()
+
+def _progress_reporter(progress_callback, file_size):
+    """
+    Returns a function that takes the bytes done so far and calls progress_callback
+    with the percentage, but only when it changes. The callback usually emits a Qt
+    signal, so this bounds it to about 100 calls per file. Returns None if there's
+    nothing to report.
+    """
+    if not progress_callback or file_size <= 0:
+        return None
+    last_percentage = -1
+
+    def report(bytes_done):
+        nonlocal last_percentage
+        percentage = (bytes_done * 100) // file_size
+        if percentage != last_percentage:
+            last_percentage = percentage
+            progress_callback(percentage)
+    return report
+
+def _read_ahead(read, chunk_size, timeout=None):
+    """
+    Yields read(chunk_size) results until EOF. The reads happen on a helper thread,
+    so the next chunks are read while the caller hashes the current one.
+    Raises TimeoutError if nothing is read for timeout seconds (a hung mount); with a
+    timeout, each chunk is read in WATCHDOG_SLICE pieces so a slow read still shows progress.
+    Use with contextlib.closing() so the helper stops if the caller bails out.
+    """
+    chunks = queue.Queue(maxsize=READ_AHEAD_DEPTH)
+    stop = threading.Event()
+    progress = [0]  # Bytes read so far by the helper
+
+    def read_chunk():
+        if timeout is None:
+            return read(chunk_size)
+        pieces = []
+        remaining = chunk_size
+        while remaining > 0:
+            piece = read(min(remaining, WATCHDOG_SLICE))
+            if not piece:
+                break
+            pieces.append(piece)
+            remaining -= len(piece)
+            progress[0] += len(piece)
+        return b"".join(pieces)
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.25)
+                return
+            except queue.Full:
+                continue
+
+    def reader():
+        try:
+            while not stop.is_set():
+                chunk = read_chunk()
+                put(chunk or _EOF)
+                if not chunk:
+                    return
+        except Exception as e:
+            put(e)
+
+    # A daemon thread, since a read hung on a dead mount must not block exit.
+    threading.Thread(target=reader, name="gbacky-read-ahead", daemon=True).start()
+    last_progress = 0
+    try:
+        while True:
+            try:
+                item = chunks.get(timeout=timeout)
+            except queue.Empty:
+                if progress[0] != last_progress:
+                    last_progress = progress[0]  # Slow, but still reading
+                    continue
+                raise TimeoutError(f"Read made no progress for {timeout}s.")
+            if item is _EOF:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+def _write_chunks(f_dst, chunks, stop, state, progress_callback, file_size):
+    """
+    Writer thread for copy_file_with_watchdog. Writes queued chunks until it gets
+    None or stop is set. state holds the bytes written so far and any error.
+    """
+    report_progress = _progress_reporter(progress_callback, file_size)
+    try:
+        while not stop.is_set():
+            try:
+                chunk = chunks.get(timeout=0.25)
+            except queue.Empty:
+                continue
+            if chunk is None:
+                return
+            # Write in slices so copy_file_with_watchdog sees progress within a chunk.
+            with memoryview(chunk) as view:
+                for offset in range(0, len(view), WATCHDOG_SLICE):
+                    piece = view[offset:offset + WATCHDOG_SLICE]
+                    f_dst.write(piece)
+                    state["written"] += len(piece)
+                    if report_progress:
+                        report_progress(state["written"])
+    except Exception as e:
+        state["error"] = e
+
+def copy_file_with_watchdog(src_path, dst_path, status_update_callback, cancellation_check_callback, log_callback, io_timeout=45, progress_callback=None, chunk_callback=None, chunk_size=IO_CHUNK):
     """
     Copies a file chunk by chunk with a watchdog timeout on each I/O operation
     to prevent hangs on network filesystems.
+    Writes happen on a separate thread, so reading (and hashing) the next chunks
+    overlaps with writing to the network destination.
+    If chunk_callback is given, it is called with every chunk read from the source.
     """
     import os
     status_update_callback(f"Copying vault to Google Drive... (this may take a while)")
     f_dst = None
+    stop_writer = threading.Event()
     try:
         if cancellation_check_callback(): raise CancellationError("Backup cancelled by user.")
         
         # Get file size for progress tracking
         file_size = os.path.getsize(src_path)
-        bytes_copied = 0
         
         # The critical part: time out the open() call for the network destination.
-        f_dst = run_with_timeout(open, args=(dst_path, 'wb'), timeout=io_timeout)
+        # The buffer matches the write slices, so each slice goes straight to the file.
+        f_dst = run_with_timeout(open, args=(dst_path, 'wb'), kwargs={'buffering': min(chunk_size, WATCHDOG_SLICE)}, timeout=io_timeout)
+
+        chunks = queue.Queue(maxsize=WRITE_QUEUE_DEPTH)
+        state = {"written": 0, "error": None}
+        writer = threading.Thread(
+            target=_write_chunks, args=(f_dst, chunks, stop_writer, state, progress_callback, file_size),
+            name="gbacky-copy-writer", daemon=True  # A write hung on a dead mount must not block exit.
+        )
+        writer.start()
+
+        def hand_over(chunk):
+            # The queue only stays full while the writer is busy, so this is the watchdog.
+            # It only counts as hung if no data is written for io_timeout.
+            deadline = time.monotonic() + io_timeout
+            last_written = state["written"]
+            while True:
+                if state["error"]:
+                    raise state["error"]
+                try:
+                    chunks.put(chunk, timeout=0.25)
+                    return
+                except queue.Full:
+                    if state["written"] != last_written:
+                        last_written = state["written"]
+                        deadline = time.monotonic() + io_timeout
+                    elif time.monotonic() > deadline:
+                        raise TimeoutError(f"Write to destination made no progress for {io_timeout}s.")
 
         with open(src_path, 'rb') as f_src:
+            _fadvise(f_src, "POSIX_FADV_SEQUENTIAL")
             while True:
                 # Reading from local disk is fast and doesn't need a watchdog.
-                chunk = f_src.read(4 * 1024 * 1024)
+                chunk = f_src.read(chunk_size)
                 if cancellation_check_callback():
                     raise CancellationError("Backup cancelled by user during file copy.")
                 if not chunk:
                     break
+                if chunk_callback:
+                    chunk_callback(chunk)
                 # Writing to network disk needs the watchdog.
-                run_with_timeout(f_dst.write, args=(chunk,), timeout=io_timeout)
-                
-                # Update progress
-                bytes_copied += len(chunk)
-                if progress_callback and file_size > 0:
-                    progress_percentage = int((bytes_copied * 100) / file_size)
-                    progress_callback(progress_percentage)
-        
+                hand_over(chunk)
+            # The vault won't be read again soon, so don't keep it in the page cache.
+            _fadvise(f_src, "POSIX_FADV_DONTNEED")
+
+        # Wait for the remaining writes. It only counts as hung if no data is written for io_timeout.
+        hand_over(None)
+        last_written = state["written"]
+        while writer.is_alive():
+            writer.join(timeout=io_timeout)
+            if writer.is_alive() and state["written"] == last_written:
+                raise TimeoutError(f"Write to destination made no progress for {io_timeout}s.")
+            last_written = state["written"]
+        if state["error"]:
+            raise state["error"]
+
         # Clear progress bar when copy is complete
         if progress_callback:
             progress_callback(0)
@@ -50,6 +260,7 @@ def copy_file_with_watchdog(src_path, dst_path, status_update_callback, cancella
         # This is for other file errors like permissions, disk full, etc.
         raise IOError(f"A file error occurred during copy to Google Drive: {e}") from e
     finally:
+        stop_writer.set()
         if f_dst:
             try:
                 # Closing the file can also hang on a dead network mount.
@@ -58,13 +269,114 @@ def copy_file_with_watchdog(src_path, dst_path, status_update_callback, cancella
                 # Log this, but don't re-raise as the primary error is more important.
                 log_callback(f"Warning: failed to close destination file handle: {e}")
 
-def calculate_sha256_with_watchdog(file_path, status_update_callback, cancellation_check_callback, log_callback, io_timeout=45, progress_callback=None):
+def is_local_filesystem(path, io_timeout=45):
+    """
+    Returns True if path is on a local, non-FUSE filesystem, judging by the mount
+    it lives on in /proc/self/mountinfo. Returns False when unsure.
+    """
+    try:
+        # stat() itself could hang on a dead network mount.
+        st_dev = run_with_timeout(os.stat, args=(path,), timeout=io_timeout).st_dev
+        device = f"{os.major(st_dev)}:{os.minor(st_dev)}"
+        with open("/proc/self/mountinfo") as f:
+            for line in f:
+                # Format: id parent major:minor root mount-point options [optional...] - fstype source ...
+                fields = line.split()
+                if fields[2] == device and " - " in line:
+                    fstype = line.split(" - ", 1)[1].split()[0]
+                    return not fstype.startswith(REMOTE_FSTYPE_PREFIXES)
+    except (OSError, IndexError):
+        pass
+    return False
+
+def _copy_local_and_hash(src_path, dst_path, cancellation_check_callback, progress_callback, hash_algo, chunk_size):
+    """
+    Copies src_path to a local destination inside the kernel with os.sendfile,
+    hashing the source on a second thread meanwhile (it reads from the page cache).
+    Returns the source's hex digest, or None if the kernel can't copy between these
+    files, in which case nothing has been copied.
+    """
+    hasher = new_hasher(hash_algo)
+    hash_errors = []
+    stop_hashing = threading.Event()
+
+    def hash_source():
+        try:
+            with open(src_path, 'rb') as f:
+                for block in iter(lambda: f.read(chunk_size), b""):
+                    if stop_hashing.is_set():
+                        return
+                    hasher.update(block)
+        except OSError as e:
+            hash_errors.append(e)
+
+    hash_thread = threading.Thread(target=hash_source, name="gbacky-hash", daemon=True)
+    hash_thread.start()
+    try:
+        with open(src_path, 'rb') as f_src, open(dst_path, 'wb') as f_dst:
+            file_size = os.fstat(f_src.fileno()).st_size
+            report_progress = _progress_reporter(progress_callback, file_size)
+            bytes_copied = 0
+            while bytes_copied < file_size:
+                if cancellation_check_callback():
+                    raise CancellationError("Backup cancelled by user during file copy.")
+                try:
+                    sent = os.sendfile(f_dst.fileno(), f_src.fileno(), None, chunk_size)
+                except OSError as e:
+                    if bytes_copied == 0 and e.errno in (errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP, errno.EXDEV):
+                        stop_hashing.set()
+                        return None
+                    raise
+                if sent == 0:
+                    break
+                bytes_copied += sent
+                if report_progress:
+                    report_progress(bytes_copied)
+    except BaseException:
+        stop_hashing.set()
+        raise
+    finally:
+        hash_thread.join()
+    if hash_errors:
+        raise hash_errors[0]
+    return hasher.hexdigest()
+
+def copy_and_hash_source(src_path, dst_path, status_update_callback, cancellation_check_callback, log_callback, io_timeout=45, progress_callback=None, hash_algo="sha256", chunk_size=IO_CHUNK):
+    """
+    Copies a file like copy_file_with_watchdog while hashing the source bytes
+    in the same pass, so the source does not need to be read a second time.
+    If the destination is on a local filesystem, the copy is done in the kernel
+    instead (see _copy_local_and_hash).
+    Returns the hex digest of the source file.
+    """
+    if is_local_filesystem(os.path.dirname(dst_path) or ".", io_timeout=io_timeout):
+        status_update_callback("Copying vault to the backup directory... (this may take a while)")
+        try:
+            digest = _copy_local_and_hash(src_path, dst_path, cancellation_check_callback, progress_callback, hash_algo, chunk_size)
+        except (IOError, OSError) as e:
+            raise IOError(f"A file error occurred during copy to the backup directory: {e}") from e
+        if digest is not None:
+            if progress_callback:
+                progress_callback(0)
+            return digest
+        log_callback("Info: in-kernel copy not supported here, falling back to a regular copy.")
+
+    source_hash = new_hasher(hash_algo)
+    copy_file_with_watchdog(
+        src_path, dst_path, status_update_callback, cancellation_check_callback, log_callback,
+        io_timeout=io_timeout, progress_callback=progress_callback, chunk_callback=source_hash.update,
+        chunk_size=chunk_size
+    )
+    return source_hash.hexdigest()
+
+def calculate_sha256_with_watchdog(file_path, status_update_callback, cancellation_check_callback, log_callback, io_timeout=45, progress_callback=None, hash_algo="sha256", chunk_size=IO_CHUNK):
     """
-    Calculates SHA256 with a watchdog timeout on each read operation to prevent hangs.
+    Calculates SHA256 (or BLAKE3, see hash_algo) with a watchdog timeout on each
+    read operation to prevent hangs.
     """
     import os
     status_update_callback("Verifying remote file integrity...")
-    sha256_hash = hashlib.sha256()
+    sha256_hash = new_hasher(hash_algo)
     f_remote = None
     try:
         # Time out the open() call for the remote file.
@@ -72,22 +384,22 @@ def calculate_sha256_with_watchdog(file_path, status_update_callback, cancellati
         
         # Get file size for progress tracking
         file_size = os.path.getsize(file_path)
+        report_progress = _progress_reporter(progress_callback, file_size)
         bytes_processed = 0
         
-        f_remote = run_with_timeout(open, args=(file_path, 'rb'), timeout=io_timeout)
-        while True:
-            byte_block = run_with_timeout(f_remote.read, args=(4 * 1024 * 1024,), timeout=io_timeout)  # Use 4MB chunks for consistency
-            if cancellation_check_callback():
-                raise CancellationError("Backup cancelled by user during hashing.")
-            if not byte_block:
-                break
-            sha256_hash.update(byte_block)
-            
-            # Update progress
-            bytes_processed += len(byte_block)
-            if progress_callback and file_size > 0:
-                progress_percentage = int((bytes_processed * 100) / file_size)
-                progress_callback(progress_percentage)
+        # The buffer matches _read_ahead's read slices, so each slice is one read from the mount.
+        f_remote = run_with_timeout(open, args=(file_path, 'rb'), kwargs={'buffering': min(chunk_size, WATCHDOG_SLICE)}, timeout=io_timeout)
+        # The read-ahead thread times out each read, like run_with_timeout did per chunk.
+        with closing(_read_ahead(f_remote.read, chunk_size, timeout=io_timeout)) as blocks:
+            for byte_block in blocks:
+                if cancellation_check_callback():
+                    raise CancellationError("Backup cancelled by user during hashing.")
+                sha256_hash.update(byte_block)
+                
+                # Update progress
+                bytes_processed += len(byte_block)
+                if report_progress:
+                    report_progress(bytes_processed)
         return sha256_hash.hexdigest()
     except TimeoutError as e:
         # This is the specific error for a hung network drive.
@@ -103,19 +415,73 @@ def calculate_sha256_with_watchdog(file_path, status_update_callback, cancellati
             except (IOError, OSError, TimeoutError) as e:
                 log_callback(f"Warning: failed to close remote file handle for hashing: {e}")
 
-def calculate_sha256_local(file_path, status_update_callback, cancellation_check_callback):
-    """Calculates the SHA256 hash of a local file without a watchdog."""
-    status_update_callback("Verifying local file integrity...")
-    sha256_hash = hashlib.sha256()
+def _hash_mapped(f, hasher, cancellation_check_callback, chunk_size):
+    """
+    Hashes an open local file through a read-only mmap, so the hasher reads the
+    page cache directly instead of a copy made by read(). Returns False, having
+    hashed nothing, if the file can't be mapped (e.g. it is empty).
+    """
     try:
-        with open(file_path, "rb") as f:
-            while True:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (ValueError, OSError):
+        return False
+    with mm:
+        if hasattr(mm, "madvise"):
+            mm.madvise(mmap.MADV_SEQUENTIAL)
+        with memoryview(mm) as view:
+            for offset in range(0, len(view), chunk_size):
                 if cancellation_check_callback():
                     raise CancellationError("Backup cancelled by user during local file hashing.")
-                byte_block = f.read(4 * 1024 * 1024)
-                if not byte_block:
-                    break
-                sha256_hash.update(byte_block)
+                hasher.update(view[offset:offset + chunk_size])
+    return True
+
+def calculate_sha256_local(file_path, status_update_callback, cancellation_check_callback, hash_algo="sha256", chunk_size=IO_CHUNK):
+    """Calculates the SHA256 (or BLAKE3) hash of a local file without a watchdog."""
+    status_update_callback("Verifying local file integrity...")
+    sha256_hash = new_hasher(hash_algo)
+    try:
+        with open(file_path, "rb") as f:
+            _fadvise(f, "POSIX_FADV_SEQUENTIAL")
+            if not _hash_mapped(f, sha256_hash, cancellation_check_callback, chunk_size):
+                with closing(_read_ahead(f.read, chunk_size)) as blocks:
+                    for byte_block in blocks:
+                        if cancellation_check_callback():
+                            raise CancellationError("Backup cancelled by user during local file hashing.")
+                        sha256_hash.update(byte_block)
+            _fadvise(f, "POSIX_FADV_DONTNEED")
         return sha256_hash.hexdigest()
     except (IOError, OSError) as e:
         raise IOError(f"Failed during local file hashing: {e}") from e
+
+def calculate_sha256_shani(file_path, status_update_callback, cancellation_check_callback, hash_algo="sha256"):
+    """
+    Calculates the SHA256 hash of a local file using an external hasher
+    (openssl or sha256sum), which can use hardware SHA extensions.
+    Falls back to calculate_sha256_local if no external hasher is available,
+    or if a different hash_algo is requested.
+    """
+    for hasher in (SHA256_COMMANDS if hash_algo == "sha256" else []):
+        try:
+            process = subprocess.Popen(hasher + [file_path], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        except FileNotFoundError:
+            continue  # Try the next hasher.
+
+        status_update_callback("Verifying local file integrity...")
+        # Poll so that a cancellation request can kill a long-running hash.
+        while True:
+            if cancellation_check_callback():
+                process.kill()
+                process.wait()
+                raise CancellationError("Backup cancelled by user during local file hashing.")
+            try:
+                stdout, stderr = process.communicate(timeout=0.25)
+                break
+            except subprocess.TimeoutExpired:
+                continue
+
+        if process.returncode != 0:
+            raise IOError(f"Failed during local file hashing: {stderr.strip()}")
+        # Both tools print '<hexdigest> <filename>'.
+        return stdout.split()[0].lower()
+
+    return calculate_sha256_local(file_path, status_update_callback, cancellation_check_callback, hash_algo)
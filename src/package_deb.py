@@ -74,7 +74,8 @@ def copy_source_files(app_share_dir):
     print("Copying application source files...")
     for filename in SOURCE_FILES:
         if os.path.exists(filename):
-            shutil.copy(filename, app_share_dir)
+            # copyfile skips the permission copy, which the staged sources don't need.
+            shutil.copyfile(filename, os.path.join(app_share_dir, filename))
             print(f"  - Copied {filename}")
         else:
             print(f"  - WARNING: Source file not found: {filename}")
@@ -123,7 +124,7 @@ def copy_icon_file(icon_dir):
     """Copies the application icon into the package structure."""
     print("Copying application icon...")
     if os.path.exists(ICON_FILE):
-        shutil.copy(ICON_FILE, os.path.join(icon_dir, f"{APP_NAME}.svg"))
+        shutil.copyfile(ICON_FILE, os.path.join(icon_dir, f"{APP_NAME}.svg"))
         print(f"  - Copied {ICON_FILE}")
     else:
         print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
@@ -160,7 +161,8 @@ def create_control_file(debian_dir):
     # without them, but the functionality will be limited. This is ideal for
     # VeraCrypt, which users often install manually.
     recommends = [
-        "veracrypt"
+        "veracrypt",
+        "python3-gi", # Lets Google Drive detection query GVFS without running 'gio'
     ]
 
     control_content = f"""Package: {APP_NAME}
@@ -1,27 +1,195 @@
 import os
+import threading
 import subprocess
-import shutil
+import concurrent.futures
 
-from PySide2.QtWidgets import (QApplication, QWidget, QVBoxLayout, QPushButton, QHBoxLayout,
+from PySide2.QtWidgets import (QWidget, QVBoxLayout, QPushButton, QHBoxLayout,
                                QLabel, QToolButton, QStyle, QFormLayout, QLineEdit,
                                QFileDialog, QMessageBox, QListWidget, QListWidgetItem,
                                QFrame, QListView, QTreeView,
                                QAbstractItemView, QCheckBox, QInputDialog, QSlider, QFrame)
-from PySide2.QtCore import Qt, Signal
-from PySide2.QtGui import QFont, QIntValidator, QColor
+from PySide2.QtCore import QObject, QRunnable, QThreadPool, Qt, Signal, Slot, QTimer
+from PySide2.QtGui import QFont, QIntValidator, QColor, QBrush
 
 from config_utils import save_config
 from settings_io import export_settings_to_file, import_settings_from_file
 from sudo_utils import is_password_required, setup_passwordless_sudo, remove_passwordless_sudo
 from credentials_manager import get_veracrypt_password, set_veracrypt_password, delete_veracrypt_password
 from veracrypt_utils import test_credentials
+from command_runner import cached_which
+
+try:
+    import gi
+    gi.require_version('Gio', '2.0')
+    from gi.repository import Gio, GLib
+except (ImportError, ValueError):
+    Gio = None  # Optional: Google Drive detection falls back to the 'gio' command.
+
+# Backup and vault paths are stored relative to the home directory.
+HOME_DIR = os.path.expanduser('~')
+HOME_PREFIX = HOME_DIR + os.sep
+
+def is_outside_home(full_path):
+    """Returns True if an absolute path is outside the home directory."""
+    # Comparing against HOME_PREFIX keeps '/home/alice2' from counting as inside '/home/alice'.
+    return not (full_path == HOME_DIR or full_path.startswith(HOME_PREFIX))
+
+def is_relative_path_outside_home(relative_path):
+    """
+    Returns True if a path stored relative to the home directory points outside it.
+    Only normalizes the string, so no filesystem or getcwd() calls are made.
+    """
+    norm = os.path.normpath(relative_path)
+    if os.path.isabs(norm):
+        return is_outside_home(norm)
+    return norm == os.pardir or norm.startswith(os.pardir + os.sep)
+
+# Vault size thresholds (bytes) for the large-vault warning, and the text for each level.
+SIZE_100MB = 100 * (1024**2)
+SIZE_400MB = 400 * (1024**2)
+SIZE_1GB = 1 * (1024**3)
+VAULT_SIZE_WARNINGS = (
+    "100 MB+: Can be slow on less robust connections.",
+    "400 MB+: Can be slow on typical connections.",
+    "1 GB+  : Can be sluggish even on fast connections."
+)
+
+GDRIVE_PROBE_TIMEOUT = 5  # Seconds allowed for each 'gio info' probe during detection
+GDRIVE_PROBE_WORKERS = 8  # 'gio info' probes run at the same time
+
+def _query_drive_name(drive_path, probe_timeout):
+    """
+    Returns the GVFS display name of a Google Drive folder using the Gio bindings,
+    in-process, or None if the query fails or takes longer than probe_timeout.
+    """
+    cancellable = Gio.Cancellable()
+    # The query can block on a hung mount, so cancel it like 'gio info' would be killed.
+    timer = threading.Timer(probe_timeout, cancellable.cancel)
+    timer.start()
+    try:
+        info = Gio.File.new_for_path(drive_path).query_info(
+            "standard::display-name", Gio.FileQueryInfoFlags.NONE, cancellable
+        )
+        return info.get_display_name()
+    except GLib.Error:
+        # Silently ignore folders that fail the check
+        return None
+    finally:
+        timer.cancel()
+
+def _probe_drive_name(drive_path, probe_timeout):
+    """Returns the GVFS display name of a Google Drive folder, or None if 'gio info' fails."""
+    if Gio is not None:
+        return _query_drive_name(drive_path, probe_timeout)
+    try:
+        command = ["gio", "info", "-a", "standard::display-name", drive_path]
+        process = subprocess.run(
+            command,
+            check=True,
+            capture_output=True,
+            text=True,
+            timeout=probe_timeout # Add a timeout for safety
+        )
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError):
+        # Silently ignore folders that fail the check
+        return None
+
+    # The attribute key "standard::display-name" contains colons,
+    # so a simple split is not reliable. We split on the full key.
+    key = "standard::display-name:"
+    for line in process.stdout.splitlines():
+        _, found, volume_name = line.partition(key)
+        if found:
+            return volume_name.strip()
+    return None
+
+def find_my_drive_paths(gvfs_path, probe_timeout=GDRIVE_PROBE_TIMEOUT):
+    """
+    Returns a (display_name, drive_path) pair for every 'My Drive' folder under the
+    Google Drive mounts in gvfs_path. Each folder needs a 'gio info' round trip, so
+    the probes run concurrently and take about as long as the slowest one.
+    """
+    # scandir gets the entry types from the directory listing itself, so the FUSE
+    # mount isn't asked for a separate stat() of every entry.
+    with os.scandir(gvfs_path) as entries:
+        mounts = [e for e in entries if e.name.startswith('google-drive:') and e.is_dir()]
+
+    candidates = []  # (user_email, drive_path) pairs
+    for mount in mounts:
+        # Extract user email for a more descriptive name. The parameters follow the
+        # 'google-drive:' prefix; a leading comma lets one ',user=' search find it anywhere.
+        params = "," + mount.name.partition(':')[2]
+        user_email = params.partition(',user=')[2].partition(',')[0] or "unknown"
+
+        with os.scandir(mount.path) as entries:
+            candidates.extend((user_email, e.path) for e in entries if e.is_dir())
+
+    if not candidates:
+        return []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(GDRIVE_PROBE_WORKERS, len(candidates))) as executor:
+        names = executor.map(lambda candidate: _probe_drive_name(candidate[1], probe_timeout), candidates)
+        return [(f"My Drive ({user_email})", drive_path)
+                for (user_email, drive_path), name in zip(candidates, names) if name == "My Drive"]
+
+
+class GdriveDetectSignals(QObject):
+    finished = Signal(object, str)  # Emits the detected (display_name, path) pairs, and an error message or ""
+
+
+class GdriveDetectTask(QRunnable):
+    """
+    Runs find_my_drive_paths on a thread pool thread, so listing a slow GVFS mount
+    and waiting on 'gio info' doesn't freeze the settings window.
+    """
+    def __init__(self, gvfs_path):
+        super().__init__()
+        self.gvfs_path = gvfs_path
+        self.signals = GdriveDetectSignals()
+
+    def run(self):
+        try:
+            detected_drives, error_msg = find_my_drive_paths(self.gvfs_path), ""
+        except Exception as e:
+            detected_drives, error_msg = [], str(e)
+        self.signals.finished.emit(detected_drives, error_msg)
+
+
+class CredentialTestSignals(QObject):
+    finished = Signal(bool, str)  # Emits success and the message from test_credentials
+
+
+class CredentialTestTask(QRunnable):
+    """
+    Runs test_credentials on a thread pool thread. 'veracrypt --test' has to decrypt
+    the volume header, which can take a few seconds.
+    """
+    def __init__(self, vault_path, password):
+        super().__init__()
+        self.vault_path = vault_path
+        self.password = password
+        self.signals = CredentialTestSignals()
+
+    def run(self):
+        # Always emit, or the Test button would stay disabled.
+        try:
+            ok, message = test_credentials(self.vault_path, self.password)
+        except Exception as e:
+            ok, message = False, str(e)
+        self.signals.finished.emit(ok, message)
+
 
 class SettingsWindow(QWidget):
     """A new window for application settings."""
     # Signal to notify the main window that settings have been saved
-    settings_saved = Signal()
+    settings_saved = Signal(object)  # Emits the saved config, or None if it must be reloaded from disk
     quit_requested = Signal()
 
+    # Backgrounds for backup directories inside and outside the home folder. setBackground
+    # takes a QBrush, so passing these avoids converting a QColor for every item.
+    EXTERNAL_DIR_BRUSH = QBrush(QColor("#F29E1F"))  # A brighter orange, as requested.
+    INTERNAL_DIR_BRUSH = QBrush(QColor(Qt.transparent))
+    EXTERNAL_DIR_TOOLTIP = "This directory is outside your home folder and may cause backup errors."
+
     def __init__(self, config, parent=None):
         super().__init__(parent)
         # This is the crucial fix: Tell Qt to treat this widget as a separate window, not a child component.
@@ -42,7 +210,9 @@ class SettingsWindow(QWidget):
             self.config["VAULT_PROFILES"].append(self.profile)
 
         self.initial_vault_path = self.profile.get("VERACRYPT_VAULT", "")
-        self.initial_password = get_veracrypt_password(self.initial_vault_path)
+        # The keyring lookup can block on D-Bus, so it is done after the window is shown.
+        self.initial_password = None
+        self._password_loaded = False
         self.initial_ask_for_password_state = is_password_required()
 
         main_layout = QVBoxLayout(self)
@@ -64,25 +234,16 @@ class SettingsWindow(QWidget):
         vault_select_button.setToolTip("Select VeraCrypt Vault File")
         vault_select_button.clicked.connect(self.select_vault_file)
 
-        vault_path_layout = QHBoxLayout()
-        vault_path_layout.setContentsMargins(0,0,0,0) # Ensure it fits snugly
-        vault_path_layout.addWidget(self.vault_path_edit)
-        vault_path_layout.addWidget(vault_select_button)
+        vault_path_layout = self._tight_hbox(self.vault_path_edit, vault_select_button)
 
         # --- Password with visibility toggle and test button ---
         self.password_edit = QLineEdit()
         self.password_edit.setEchoMode(QLineEdit.Password)
         self.password_edit.setFixedWidth(width_32_chars)
 
-        # Check if a password exists in the keyring for the current vault
-        if self.initial_password:
-            self.password_edit.setText(self.initial_password)
-            self.password_edit.setPlaceholderText("Password loaded from keyring.")
-        else:
-            self.password_edit.setPlaceholderText("Enter new password here.")
-
-        password_layout = QHBoxLayout()
-        password_layout.setContentsMargins(0,0,0,0)
+        # Disabled until _load_initial_password has checked the keyring, so nothing typed is overwritten.
+        self.password_edit.setEnabled(False)
+        self.password_edit.setPlaceholderText("Loading password from keyring...")
 
         toggle_visibility_button = QToolButton()
         toggle_visibility_button.setText("👁️") # This emoji works on most modern systems
@@ -93,9 +254,7 @@ class SettingsWindow(QWidget):
         self.test_button.setToolTip("Test the vault path and password")
         self.test_button.clicked.connect(self.test_veracrypt_credentials)
 
-        password_layout.addWidget(self.password_edit)
-        password_layout.addWidget(toggle_visibility_button)
-        password_layout.addWidget(self.test_button)
+        password_layout = self._tight_hbox(self.password_edit, toggle_visibility_button, self.test_button)
 
         # --- Backup Directories List ---
         backup_dirs_widget = QWidget()
@@ -103,8 +262,10 @@ class SettingsWindow(QWidget):
         backup_dirs_layout.setContentsMargins(0,0,0,0)
         self.backup_dirs_list = QListWidget()
         self.backup_dirs_list.setSelectionMode(QAbstractItemView.ExtendedSelection)
-        for directory in self.profile.get("BACKUP_DIRS", []):
-            self.backup_dirs_list.addItem(QListWidgetItem(directory))
+        self.backup_dirs_list.addItems(self.profile.get("BACKUP_DIRS", []))
+        # Kept in sync with the list, for duplicate checks when adding directories.
+        self._backup_dir_set = set(self.profile.get("BACKUP_DIRS", []))
+        self._add_dirs_dialog = None  # Built on first use by add_backup_directories
         backup_dirs_layout.addWidget(self.backup_dirs_list)
 
         add_remove_layout = QHBoxLayout()
@@ -118,14 +279,14 @@ class SettingsWindow(QWidget):
         # --- Other input fields ---
         self.gdrive_path_edit = QLineEdit(self.config.get("GOOGLE_DRIVE_PATH", ""))
 
-        gdrive_path_detect_button = QPushButton("Detect...")
-        gdrive_path_detect_button.setToolTip("Attempt to auto-detect mounted Google Drive paths")
-        gdrive_path_detect_button.clicked.connect(self.detect_gdrive_paths)
+        self.gdrive_path_detect_button = QPushButton("Detect...")
+        self.gdrive_path_detect_button.setToolTip("Attempt to auto-detect mounted Google Drive paths")
+        self.gdrive_path_detect_button.clicked.connect(self.detect_gdrive_paths)
 
         gdrive_path_layout = QHBoxLayout()
         gdrive_path_layout.setContentsMargins(0,0,0,0)
         gdrive_path_layout.addWidget(self.gdrive_path_edit, 1) # Give the line edit more stretch
-        gdrive_path_layout.addWidget(gdrive_path_detect_button)
+        gdrive_path_layout.addWidget(self.gdrive_path_detect_button)
 
 
         self.gdrive_dir_edit = QLineEdit(self.config.get("GOOGLE_DRIVE_BACKUP_DIR", ""))
@@ -135,10 +296,7 @@ class SettingsWindow(QWidget):
         gdrive_dir_select_button.setToolTip("Select Google Drive Backup Folder")
         gdrive_dir_select_button.clicked.connect(self.select_gdrive_folder)
 
-        gdrive_dir_layout = QHBoxLayout()
-        gdrive_dir_layout.setContentsMargins(0,0,0,0)
-        gdrive_dir_layout.addWidget(self.gdrive_dir_edit)
-        gdrive_dir_layout.addWidget(gdrive_dir_select_button)
+        gdrive_dir_layout = self._tight_hbox(self.gdrive_dir_edit, gdrive_dir_select_button)
 
         self.autoclose_edit = QLineEdit(str(self.config.get("AUTO_CLOSE_SECONDS", 5)))
         self.autoclose_edit.setToolTip("How long the program will wait to close after sucessful backup. Set to 0 to disable auto-close.")
@@ -239,6 +397,24 @@ class SettingsWindow(QWidget):
         super().showEvent(event)
         # Refresh highlights every time the window is shown to ensure consistency.
         self._refresh_list_highlights()
+        if not self._password_loaded:
+            # Let the window paint first.
+            QTimer.singleShot(0, self._load_initial_password)
+
+    def _load_initial_password(self):
+        """Fills in the vault password from the keyring, once."""
+        if self._password_loaded:
+            return
+        self._password_loaded = True
+        self.initial_password = get_veracrypt_password(self.initial_vault_path)
+
+        # Check if a password exists in the keyring for the current vault
+        if self.initial_password:
+            self.password_edit.setText(self.initial_password)
+            self.password_edit.setPlaceholderText("Password loaded from keyring.")
+        else:
+            self.password_edit.setPlaceholderText("Enter new password here.")
+        self.password_edit.setEnabled(True)
         
     def keyPressEvent(self, event):
         """Handles key presses for the settings window."""
@@ -265,25 +441,30 @@ class SettingsWindow(QWidget):
         self.network_quality_label.setToolTip(tooltip)
 
     # --- Helper Methods ---
+    @staticmethod
+    def _tight_hbox(*widgets):
+        """Returns a zero-margin QHBoxLayout holding the given widgets, so it fits snugly in a form row."""
+        layout = QHBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        for widget in widgets:
+            layout.addWidget(widget)
+        return layout
+
     def _refresh_list_highlights(self):
         """Iterates through the backup list and applies highlighting to external directories."""
-        home_dir = os.path.expanduser('~')
         for i in range(self.backup_dirs_list.count()):
             item = self.backup_dirs_list.item(i)
-            relative_path = item.text()
-            # Resolve the path to an absolute path to reliably check if it's outside home.
-            full_path = os.path.abspath(os.path.join(home_dir, relative_path))
-
-            is_external = not full_path.startswith(home_dir)
+            self._apply_list_highlight(item, is_relative_path_outside_home(item.text()))
 
-            if is_external:
-                # Use a brighter orange as requested.
-                item.setBackground(QColor("#F29E1F"))
-                item.setToolTip("This directory is outside your home folder and may cause backup errors.")
-            else:
-                # Explicitly remove background color for non-external items.
-                item.setBackground(QColor(Qt.transparent))
-                item.setToolTip("")
+    def _apply_list_highlight(self, item, is_external):
+        """Highlights a backup list item if its directory is outside the home folder."""
+        if is_external:
+            item.setBackground(self.EXTERNAL_DIR_BRUSH)
+            item.setToolTip(self.EXTERNAL_DIR_TOOLTIP)
+        else:
+            # Explicitly remove background color for non-external items.
+            item.setBackground(self.INTERNAL_DIR_BRUSH)
+            item.setToolTip("")
 
     def handle_sudoers_change(self):
         """Called on save to manage the sudoers file if the checkbox state changed."""
@@ -306,13 +487,11 @@ class SettingsWindow(QWidget):
     # --- Slots / Event Handlers ---
     def save_and_close(self):
         """Update the config dictionary, save it to file, and close the window."""
+        self._load_initial_password()  # The password comparison below needs the stored one.
         self.handle_sudoers_change()
 
         # Collect backup directories from the list widget
-        backup_dirs = []
-        for i in range(self.backup_dirs_list.count()):
-            backup_dirs.append(self.backup_dirs_list.item(i).text())
-        self.profile["BACKUP_DIRS"] = backup_dirs
+        self.profile["BACKUP_DIRS"] = [self.backup_dirs_list.item(i).text() for i in range(self.backup_dirs_list.count())]
 
         # --- Handle Password and Vault Path Changes ---
         new_vault_path = self.vault_path_edit.text()
@@ -371,7 +550,8 @@ class SettingsWindow(QWidget):
             self.config['CONFIG_VER'] = 1
 
         save_config(self.config)
-        self.settings_saved.emit()
+        # The saved config is already in memory, so the main window doesn't need to re-read it.
+        self.settings_saved.emit(self.config)
         self.close()
 
     def on_export_clicked(self):
@@ -382,7 +562,7 @@ class SettingsWindow(QWidget):
         """Handles the import button click and reloads settings on success."""
         success = import_settings_from_file(self)
         if success:
-            self.settings_saved.emit()
+            self.settings_saved.emit(None) # The imported file still has to be loaded and validated
             self.close()
 
     def remove_backup_directory(self):
@@ -391,17 +571,12 @@ class SettingsWindow(QWidget):
         if not selected_items:
             return # Nothing selected, so do nothing.
         for item in selected_items:
+            self._backup_dir_set.discard(item.text())
             self.backup_dirs_list.takeItem(self.backup_dirs_list.row(item))
 
-    def add_backup_directories(self):
-        """
-        Opens a dialog that allows selecting multiple directories.
-        """
-        home_dir = os.path.expanduser('~')
-        documents_dir = os.path.join(home_dir, 'Documents')
-        start_dir = documents_dir if os.path.isdir(documents_dir) else home_dir
-
-        dialog = QFileDialog(self, "Select Directories to Backup", start_dir)
+    def _create_add_dirs_dialog(self):
+        """Builds the non-native directory dialog used by add_backup_directories."""
+        dialog = QFileDialog(self, "Select Directories to Backup")
         dialog.setFileMode(QFileDialog.Directory)
         dialog.resize(1024, 1024)
         
@@ -417,6 +592,20 @@ class SettingsWindow(QWidget):
         tree_view = dialog.findChild(QTreeView)
         if tree_view:
             tree_view.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        return dialog
+
+    def add_backup_directories(self):
+        """
+        Opens a dialog that allows selecting multiple directories.
+        """
+        documents_dir = os.path.join(HOME_DIR, 'Documents')
+        start_dir = documents_dir if os.path.isdir(documents_dir) else HOME_DIR
+
+        if self._add_dirs_dialog is None:
+            self._add_dirs_dialog = self._create_add_dirs_dialog()
+        dialog = self._add_dirs_dialog
+        # Reusing the dialog keeps its directory model, so only the start directory is reset.
+        dialog.setDirectory(start_dir)
 
         if not dialog.exec_():
             return
@@ -426,21 +615,24 @@ class SettingsWindow(QWidget):
             return
 
         # --- Process selected paths ---
-        existing_items = {self.backup_dirs_list.item(i).text() for i in range(self.backup_dirs_list.count())}
-
-        paths_to_add = []
+        paths_to_add = []  # (relative_path, is_external) pairs
         external_paths_to_warn = []
 
-        for dir_path in sorted(list(selected_dirs)):
-            relative_path = os.path.relpath(dir_path, home_dir)
-            if relative_path in existing_items:
+        for dir_path in sorted(selected_dirs):
+            # The dialog returns absolute paths, so normalizing is enough (no getcwd()).
+            dir_path = os.path.normpath(dir_path)
+            is_external = is_outside_home(dir_path)
+            if is_external or dir_path == HOME_DIR:
+                relative_path = os.path.relpath(dir_path, HOME_DIR)
+            else:
+                relative_path = dir_path[len(HOME_PREFIX):]
+            if relative_path in self._backup_dir_set:
                 continue  # Skip duplicates
 
-            is_external = not os.path.abspath(dir_path).startswith(home_dir)
             if is_external:
                 external_paths_to_warn.append(relative_path)
             else:
-                paths_to_add.append(relative_path)
+                paths_to_add.append((relative_path, False))
 
         # --- Handle warnings for external paths in a single dialog ---
         warn_on_external = self.config.get("WARN_ON_EXTERNAL_DIR", True)
@@ -463,13 +655,20 @@ class SettingsWindow(QWidget):
                 self.config["WARN_ON_EXTERNAL_DIR"] = False
 
             if msg_box.clickedButton() == add_button:
-                paths_to_add.extend(external_paths_to_warn)
+                paths_to_add.extend((p, True) for p in external_paths_to_warn)
 
         # --- Add all approved paths to the list widget ---
-        for relative_path in paths_to_add:
-            item = QListWidgetItem(relative_path)
-            self.backup_dirs_list.addItem(item)
-        self._refresh_list_highlights()
+        # Add them as one batch, so the list is only repainted once. They are already
+        # classified, so only the new items need highlighting.
+        self.backup_dirs_list.setUpdatesEnabled(False)
+        try:
+            for relative_path, is_external in paths_to_add:
+                self._backup_dir_set.add(relative_path)
+                item = QListWidgetItem(relative_path)
+                self._apply_list_highlight(item, is_external)
+                self.backup_dirs_list.addItem(item)
+        finally:
+            self.backup_dirs_list.setUpdatesEnabled(True)
 
     def toggle_password_visibility(self):
         """Toggles the password field between visible and hidden."""
@@ -488,51 +687,51 @@ class SettingsWindow(QWidget):
                                 "Please provide both the VeraCrypt Vault path and the password to run a test.")
             return
 
-        home_dir = os.path.expanduser('~')
-        full_vault_path = os.path.join(home_dir, vault_relative_path)
+        full_vault_path = os.path.join(HOME_DIR, vault_relative_path)
 
-        # Disable button during the test and force the UI to update
+        # Disable the button during the test; the result arrives in _on_credential_test_finished.
         self.test_button.setEnabled(False)
         self.test_button.setText("Testing...")
-        QApplication.processEvents()
-
-        try:
-            # Call the new utility function which handles the command execution
-            success, message = test_credentials(full_vault_path, password_to_test)
+        test_task = CredentialTestTask(full_vault_path, password_to_test)
+        test_task.signals.finished.connect(self._on_credential_test_finished)
+        QThreadPool.globalInstance().start(test_task)
+
+    @Slot(bool, str)
+    def _on_credential_test_finished(self, success, message):
+        """Shows the result of a CredentialTestTask."""
+        self.test_button.setEnabled(True)
+        self.test_button.setText("Test")
+        if not self.isVisible():
+            return  # The window was closed while testing.
+
+        msg_box = QMessageBox(self)
+        msg_box.setIcon(QMessageBox.NoIcon)
+        msg_box.setText(message)
+        msg_box.setStandardButtons(QMessageBox.Ok)
+        msg_box.setStyleSheet("QLabel{min-width: 450px;}")
 
-            msg_box = QMessageBox(self)
-            msg_box.setIcon(QMessageBox.NoIcon)
-            msg_box.setText(message)
-            msg_box.setStandardButtons(QMessageBox.Ok)
-            msg_box.setStyleSheet("QLabel{min-width: 450px;}")
-
-            if success:
-                msg_box.setWindowTitle("Success")
-            else:
-                msg_box.setWindowTitle("Test Failed")
-            msg_box.exec_()
-        finally:
-            # Always re-enable the button
-            self.test_button.setEnabled(True)
-            self.test_button.setText("Test")
+        if success:
+            msg_box.setWindowTitle("Success")
+        else:
+            msg_box.setWindowTitle("Test Failed")
+        msg_box.exec_()
 
     def select_vault_file(self):
         """Opens a file dialog to select the VeraCrypt vault file."""
-        home_dir = os.path.expanduser('~')
         current_relative_path = self.vault_path_edit.text()
 
         start_dir = ""
         if current_relative_path:
             # Construct full path to get its directory
-            full_current_path = os.path.join(home_dir, current_relative_path)
+            full_current_path = os.path.join(HOME_DIR, current_relative_path)
             start_dir = os.path.dirname(full_current_path)
 
         # Fallback if path is empty or directory doesn't exist
         if not start_dir or not os.path.isdir(start_dir):
-            start_dir = os.path.join(home_dir, 'Documents')
+            start_dir = os.path.join(HOME_DIR, 'Documents')
             # Final fallback to home if Documents doesn't exist
             if not os.path.isdir(start_dir):
-                start_dir = home_dir
+                start_dir = HOME_DIR
         
         dialog = QFileDialog(
             self,
@@ -552,11 +751,6 @@ class SettingsWindow(QWidget):
                 try:
                     file_size_bytes = os.path.getsize(file_path)
 
-                    # Define size thresholds (bytes)
-                    SIZE_100MB = 100 * (1024**2)
-                    SIZE_400MB = 400 * (1024**2)
-                    SIZE_1GB = 1 * (1024**3)
-
                     # Determine the warning level
                     user_level = 0
                     if file_size_bytes >= SIZE_1GB:
@@ -567,23 +761,12 @@ class SettingsWindow(QWidget):
                         user_level = 1
 
                     if user_level > 0:
-                        # Define the text for each warning level
-                        warning_texts = [
-                            "100 MB+: Can be slow on less robust connections.",
-                            "400 MB+: Can be slow on typical connections.",
-                            "1 GB+  : Can be sluggish even on fast connections."
-                        ]
-
                         # Build the HTML list, highlighting the user's current level
-                        warning_list_items = []
                         highlight_index = user_level - 1
-                        for i, text in enumerate(warning_texts):
-                            if i == highlight_index:
-                                item_html = f"<li><b>&gt;&gt; {text} &lt;&lt;</b></li>"
-                            else:
-                                item_html = f"<li>{text}</li>"
-                            warning_list_items.append(item_html)
-                        warnings_html = "".join(warning_list_items)
+                        warnings_html = "".join(
+                            f"<li><b>&gt;&gt; {text} &lt;&lt;</b></li>" if i == highlight_index else f"<li>{text}</li>"
+                            for i, text in enumerate(VAULT_SIZE_WARNINGS)
+                        )
 
                         # Format the file size for display
                         size_value, size_unit = (file_size_bytes / (1024**3), "GB") if file_size_bytes > SIZE_1GB else (file_size_bytes / (1024**2), "MB")
@@ -610,94 +793,65 @@ class SettingsWindow(QWidget):
                     pass
 
                 # Make the path relative to the home directory for storage in config
-                home_dir = os.path.expanduser('~')
-                relative_path = os.path.relpath(file_path, home_dir)
+                relative_path = os.path.relpath(file_path, HOME_DIR)
                 self.vault_path_edit.setText(relative_path)
 
     def detect_gdrive_paths(self):
         """Attempts to find 'My Drive' directories using 'gio info'."""
-        if not shutil.which("gio"):
+        # The gio command is only needed when the Gio bindings aren't available.
+        if Gio is None and not cached_which("gio"):
+            cached_which.cache_clear()  # Look again next time, in case it gets installed.
             QMessageBox.warning(self, "Detection Tool Missing", "'gio' command not found. Please ensure it is installed to use this feature.")
             return
 
-        try:
-            uid = os.getuid()
-            gvfs_path = f"/run/user/{uid}/gvfs/"
+        uid = os.getuid()
+        gvfs_path = f"/run/user/{uid}/gvfs/"
 
-            if not os.path.isdir(gvfs_path):
-                QMessageBox.information(self, "Detection Failed", f"The standard GVFS directory was not found at:\n{gvfs_path}")
-                return
-            
-            probe_timeout = 5 # Default - use a reasonable timeout for this detection
-
-            detected_drives = []
-            top_level_mounts = [d for d in os.listdir(gvfs_path) if d.startswith('google-drive:')]
-
-            for mount_name in top_level_mounts:
-                mount_path = os.path.join(gvfs_path, mount_name)
-                if not os.path.isdir(mount_path):
-                    continue
-
-                # Extract user email for a more descriptive name
-                user_email = "unknown"
-                for part in mount_name.split(','):
-                    if part.startswith('user='):
-                        user_email = part.split('=', 1)[1]
-                        break
-
-                for drive_id in os.listdir(mount_path):
-                    drive_path = os.path.join(mount_path, drive_id)
-                    if not os.path.isdir(drive_path):
-                        continue
-
-                    try:
-                        command = ["gio", "info", "-a", "standard::display-name", drive_path]
-                        process = subprocess.run(
-                            command,
-                            check=True,
-                            capture_output=True,
-                            text=True,
-                            timeout=probe_timeout # Add a timeout for safety
-                        )
+        if not os.path.isdir(gvfs_path):
+            QMessageBox.information(self, "Detection Failed", f"The standard GVFS directory was not found at:\n{gvfs_path}")
+            return
 
-                        for line in process.stdout.strip().split('\n'):
-                            # The attribute key "standard::display-name" contains colons,
-                            # so a simple split is not reliable. We split on the full key.
-                            key = "standard::display-name:"
-                            if key in line:
-                                volume_name = line.split(key, 1)[1].strip()
-                                if volume_name == "My Drive":
-                                    display_name = f"My Drive ({user_email})"
-                                    detected_drives.append((display_name, drive_path))
-                                break # Found the attribute, move to next drive_id
-                    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError):
-                        # Silently ignore folders that fail the check
-                        continue
-
-            if not detected_drives:
-                QMessageBox.information(self, "Detection Complete", "No 'My Drive' folders were found. Please ensure your Google account is mounted in your file manager.")
-                return
+        # The result arrives in _on_gdrive_detection_finished.
+        self.gdrive_path_detect_button.setEnabled(False)
+        self.gdrive_path_detect_button.setText("Detecting...")
+        detect_task = GdriveDetectTask(gvfs_path)
+        detect_task.signals.finished.connect(self._on_gdrive_detection_finished)
+        QThreadPool.globalInstance().start(detect_task)
+
+    @Slot(object, str)
+    def _on_gdrive_detection_finished(self, detected_drives, error_msg):
+        """Lets the user pick from the 'My Drive' folders found by GdriveDetectTask."""
+        self.gdrive_path_detect_button.setEnabled(True)
+        self.gdrive_path_detect_button.setText("Detect...")
+        if not self.isVisible():
+            return  # The window was closed while detecting.
+
+        if error_msg:
+            QMessageBox.critical(self, "Detection Error", f"An unexpected error occurred during detection:\n{error_msg}")
+            return
 
-            if len(detected_drives) == 1:
-                # If only one is found, just use it without prompting.
-                display_name, full_path = detected_drives[0]
+        if not detected_drives:
+            QMessageBox.information(self, "Detection Complete", "No 'My Drive' folders were found. Please ensure your Google account is mounted in your file manager.")
+            return
+
+        if len(detected_drives) == 1:
+            # If only one is found, just use it without prompting.
+            display_name, full_path = detected_drives[0]
+            self.gdrive_path_edit.setText(full_path)
+            QMessageBox.information(self, "Drive Detected", f"Automatically selected the detected Google Drive:\n{display_name}")
+        else:
+            # If multiple are found, prompt the user to choose.
+            drive_options = {display: path for display, path in detected_drives}
+            selected_display_name, ok = QInputDialog.getItem(
+                self,
+                "Select Google Drive Account",
+                "Multiple 'My Drive' folders detected. Please choose one:",
+                list(drive_options.keys()),
+                0, False # Items are not editable
+            )
+            if ok and selected_display_name:
+                full_path = drive_options[selected_display_name]
                 self.gdrive_path_edit.setText(full_path)
-                QMessageBox.information(self, "Drive Detected", f"Automatically selected the detected Google Drive:\n{display_name}")
-            else:
-                # If multiple are found, prompt the user to choose.
-                drive_options = {display: path for display, path in detected_drives}
-                selected_display_name, ok = QInputDialog.getItem(
-                    self,
-                    "Select Google Drive Account",
-                    "Multiple 'My Drive' folders detected. Please choose one:",
-                    list(drive_options.keys()),
-                    0, False # Items are not editable
-                )
-                if ok and selected_display_name:
-                    full_path = drive_options[selected_display_name]
-                    self.gdrive_path_edit.setText(full_path)
-        except Exception as e:
-            QMessageBox.critical(self, "Detection Error", f"An unexpected error occurred during detection:\n{e}")
 
     def select_gdrive_folder(self):
         """Opens a directory dialog to select the Google Drive backup folder."""
@@ -731,8 +885,11 @@ class SettingsWindow(QWidget):
             selected_files = dialog.selectedFiles()
             if selected_files:
                 dir_path = selected_files[0]
-                # Ensure the selected path is within the base path
-                if os.path.commonpath([dir_path, gdrive_base_path]) != gdrive_base_path:
+                # Ensure the selected path is within the base path. normpath() only touches the
+                # strings, and also accepts a base path typed with a trailing slash.
+                base_path = os.path.normpath(gdrive_base_path)
+                dir_path = os.path.normpath(dir_path)
+                if dir_path != base_path and not dir_path.startswith(base_path.rstrip(os.sep) + os.sep):
                     QMessageBox.warning(self, "Invalid Directory", "The selected directory must be inside your Google Drive Mount Path.")
                     return
 
@@ -6,6 +6,9 @@ from PySide2.QtWidgets import QFileDialog, QMessageBox
 
 from config_utils import get_config_dir
 
+# Default folder for the export and import dialogs.
+DOCUMENTS_DIR = os.path.join(os.path.expanduser('~'), 'Documents')
+
 def export_settings_to_file(parent):
     """Exports the current config file to a user-selected location."""
     config_dir = get_config_dir()
@@ -14,8 +17,7 @@ def export_settings_to_file(parent):
         QMessageBox.warning(parent, "Export Failed", "No configuration file found to export.")
         return
 
-    documents_dir = os.path.join(os.path.expanduser('~'), 'Documents')
-    default_export_path = os.path.join(documents_dir, 'gdbackup_settings.json')
+    default_export_path = os.path.join(DOCUMENTS_DIR, 'gdbackup_settings.json')
 
     save_path, _ = QFileDialog.getSaveFileName(
         parent,
@@ -26,7 +28,8 @@ def export_settings_to_file(parent):
 
     if save_path:
         try:
-            shutil.copy2(source_path, save_path)
+            # Only the contents matter, so skip copy2's extra metadata syscalls.
+            shutil.copyfile(source_path, save_path)
             QMessageBox.information(parent, "Success", f"Settings successfully exported to:\n{save_path}")
         except (IOError, OSError) as e:
             QMessageBox.critical(parent, "Export Error", f"Could not export settings file.\n\nError: {e}")
@@ -54,9 +57,8 @@ def import_settings_from_file(parent):
         if reply != QMessageBox.Yes:
             return False
 
-    documents_dir = os.path.join(os.path.expanduser('~'), 'Documents')
     import_path, _ = QFileDialog.getOpenFileName(
-        parent, "Import Settings File", documents_dir, "JSON Files (*.json);;All Files (*)"
+        parent, "Import Settings File", DOCUMENTS_DIR, "JSON Files (*.json);;All Files (*)"
     )
 
     if import_path:
@@ -65,18 +67,21 @@ def import_settings_from_file(parent):
         # handles the case of importing on a fresh first run.
         os.makedirs(config_dir, exist_ok=True)
 
-        if os.path.exists(current_config_path):
-            today_str = datetime.now().strftime('%Y-%m-%d')
-            backup_filename = f"config.json.backup.{today_str}"
-            backup_path = os.path.join(config_dir, backup_filename)
-            try:
-                shutil.move(current_config_path, backup_path)
-            except (IOError, OSError) as e:
-                QMessageBox.critical(parent, "Backup Error", f"Could not back up existing config file.\nImport cancelled.\n\nError: {e}")
-                return False
+        today_str = datetime.now().strftime('%Y-%m-%d')
+        backup_filename = f"config.json.backup.{today_str}"
+        backup_path = os.path.join(config_dir, backup_filename)
+        try:
+            # The backup sits next to the config, so this is always a plain rename.
+            # Trying it directly avoids a separate exists() check.
+            os.replace(current_config_path, backup_path)
+        except FileNotFoundError:
+            pass  # No existing config (e.g. first run), so there is nothing to back up.
+        except (IOError, OSError) as e:
+            QMessageBox.critical(parent, "Backup Error", f"Could not back up existing config file.\nImport cancelled.\n\nError: {e}")
+            return False
 
         try:
-            shutil.copy2(import_path, current_config_path)
+            shutil.copyfile(import_path, current_config_path)
             QMessageBox.information(parent, "Success", "Settings successfully imported. The application will now reload the new settings.")
             return True
         except (IOError, OSError) as e:
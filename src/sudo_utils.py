@@ -1,17 +1,19 @@
 import os
 import subprocess
 
+from PySide2.QtCore import QProcess
 from PySide2.QtWidgets import QMessageBox, QInputDialog, QLineEdit
 from config_utils import is_dev_environment
 
+# The environment can't change while the app runs, so the path is picked once.
+SUDOERS_FILE = ('/etc/sudoers.d/veracrypt-backup-script-dev' if is_dev_environment()
+                else '/etc/sudoers.d/veracrypt-backup-script')
+
 def get_sudoers_file_path():
     """
     Determines the appropriate sudoers file path based on the environment.
     """
-    if is_dev_environment():
-        return '/etc/sudoers.d/veracrypt-backup-script-dev'
-    else:
-        return '/etc/sudoers.d/veracrypt-backup-script'
+    return SUDOERS_FILE
 
 def is_password_required():
     """Checks if the passwordless sudo file exists."""
@@ -29,12 +31,40 @@ def verify_sudo_password(password):
         # It's a safe and standard way to validate a password.
         process = subprocess.run(
             ['sudo', '-S', '-v'],
-            input=password, text=True, capture_output=True, check=False
+            input=password.encode(), capture_output=True, check=False
         )
         return process.returncode == 0
     except FileNotFoundError:
         return False # Should not happen if sudo is installed.
 
+def verify_sudo_password_async(password, parent, callback):
+    """
+    Like verify_sudo_password, but runs sudo in a QProcess so the GUI keeps
+    responding while PAM checks the password. callback(ok) is called on the
+    GUI thread once sudo has finished.
+    """
+    if not password:
+        callback(False)
+        return
+
+    process = QProcess(parent)
+
+    def on_finished(exit_code, exit_status):
+        process.deleteLater()
+        callback(exit_status == QProcess.NormalExit and exit_code == 0)
+
+    def on_error(error):
+        # 'finished' is not emitted if sudo could not be started at all.
+        if error == QProcess.FailedToStart:
+            process.deleteLater()
+            callback(False)
+
+    process.finished.connect(on_finished)
+    process.errorOccurred.connect(on_error)
+    process.start("sudo", ["-S", "-v"])
+    process.write((password + "\n").encode())
+    process.closeWriteChannel()
+
 def setup_passwordless_sudo(parent):
     """
     Guides the user through creating the passwordless sudo file.
@@ -63,7 +93,7 @@ def setup_passwordless_sudo(parent):
     command_str = f"echo {content} > {sudoers_file} && chmod 0440 {sudoers_file}"
     command = ["sudo", "-S", "sh", "-c", command_str]
 
-    process = subprocess.run(command, input=password, capture_output=True, text=True)
+    process = subprocess.run(command, input=password.encode(), capture_output=True)
 
     if process.returncode == 0:
         QMessageBox.information(parent, "Success", "Passwordless sudo rule for VeraCrypt has been created.")
@@ -72,7 +102,7 @@ def setup_passwordless_sudo(parent):
         err_box = QMessageBox(parent)
         err_box.setIcon(QMessageBox.NoIcon)
         err_box.setWindowTitle("Failed")
-        err_box.setText(f"Could not create sudoers file. Sudo may have rejected the password.\n\nError: {process.stderr}")
+        err_box.setText(f"Could not create sudoers file. Sudo may have rejected the password.\n\nError: {process.stderr.decode(errors='replace')}")
         err_box.setStandardButtons(QMessageBox.Ok)
         err_box.setStyleSheet("QLabel{min-width: 500px;}")
         err_box.exec_()
@@ -89,7 +119,7 @@ def remove_passwordless_sudo(parent):
 
     sudoers_file = get_sudoers_file_path()
     command = ["sudo", "-S", "rm", "-f", sudoers_file]
-    process = subprocess.run(command, input=password, capture_output=True, text=True)
+    process = subprocess.run(command, input=password.encode(), capture_output=True)
 
     if process.returncode == 0:
         QMessageBox.information(parent, "Success", "Passwordless sudo rule for VeraCrypt has been removed.")
@@ -98,7 +128,7 @@ def remove_passwordless_sudo(parent):
         err_box = QMessageBox(parent)
         err_box.setIcon(QMessageBox.NoIcon)
         err_box.setWindowTitle("Failed")
-        err_box.setText(f"Could not remove sudoers file. Sudo may have rejected the password.\n\nError: {process.stderr}")
+        err_box.setText(f"Could not remove sudoers file. Sudo may have rejected the password.\n\nError: {process.stderr.decode(errors='replace')}")
         err_box.setStandardButtons(QMessageBox.Ok)
         err_box.setStyleSheet("QLabel{min-width: 500px;}")
         err_box.exec_()
@@ -1,25 +1,77 @@
 import os
+import re
 import subprocess
+import time
 
 from command_runner import run_command
 
+# Short-lived cache of the parsed 'veracrypt --list' output, shared by all vaults: (timestamp, {vault_path: mount_point}) or None
+_mount_cache = None
+MOUNT_CACHE_TTL = 2.0  # seconds
+
+# A 'veracrypt --text --list' line: "<slot>: <volume path> <virtual device> <mount point>".
+# Matching the device in the middle keeps volume paths with spaces intact.
+_LIST_LINE_RE = re.compile(r"^\s*\d+:\s+(?P<volume>.+?)\s+/dev/\S+\s+(?P<mount_point>.+?)\s*$")
+
+def veracrypt_command(*args):
+    """Builds a non-interactive, text-mode veracrypt command line with the given arguments."""
+    return ["veracrypt", "--text", "--non-interactive", *args]
+
+def _canonical_path(path):
+    """Resolves ~, symlinks and '..' so different spellings of one vault path compare equal."""
+    return os.path.realpath(os.path.expanduser(path))
+
+def list_all_mounts(sudo_password=None, log_callback=None):
+    """
+    Runs 'veracrypt --list' and returns a {vault_path: mount_point} dict. It is empty
+    if the command fails, which includes the case where no volumes are mounted.
+    One run covers every vault, so callers checking several vaults should call this
+    once and pass the result to find_mount_point for each one.
+    """
+    command = veracrypt_command("--list")
+    process = run_command(command, sudo_password=sudo_password, log_callback=log_callback)
+    mounts = {}
+    if process:
+        for line in process.stdout.splitlines():
+            match = _LIST_LINE_RE.match(line)
+            if match:
+                mounts[_canonical_path(match["volume"])] = match["mount_point"]
+    return mounts
+
+def find_mount_point(mounts, vault_path):
+    """Returns the mount point for vault_path from a list_all_mounts dict, or None."""
+    mount_point = mounts.get(_canonical_path(vault_path))
+    if mount_point is None:
+        # Fall back to the substring match used before the listing was parsed, for
+        # volumes veracrypt lists in a form that doesn't resolve to the same path.
+        mount_point = next((mp for volume, mp in mounts.items() if vault_path in volume), None)
+    # Only the matching entry is checked on disk.
+    if mount_point and os.path.isdir(mount_point):
+        return mount_point
+    return None # Vault not listed, or no valid mount point for it
+
 def get_mount_point(vault_path, sudo_password=None, log_callback=None):
     """
     Parses 'veracrypt --list' to find the mount point for a given vault.
     Returns the mount point path as a string, or None if not found or an error occurs.
     """
-    command = ["veracrypt", "--text", "--list"]
-    process = run_command(command, sudo_password=sudo_password, log_callback=log_callback)
+    return find_mount_point(list_all_mounts(sudo_password, log_callback), vault_path)
 
-    if not process:
-        return None
+def cached_get_mount_point(vault_path, sudo_password=None, log_callback=None, ttl=MOUNT_CACHE_TTL):
+    """
+    Like get_mount_point, but reuses a 'veracrypt --list' result obtained within
+    the last 'ttl' seconds, for any vault, to avoid spawning it repeatedly.
+    Call invalidate_mount_cache() after mounting or dismounting.
+    """
+    global _mount_cache
+    if _mount_cache is None or time.monotonic() - _mount_cache[0] >= ttl:
+        _mount_cache = (time.monotonic(), list_all_mounts(sudo_password, log_callback))
+    return find_mount_point(_mount_cache[1], vault_path)
 
-    for line in process.stdout.strip().split('\n'):
-        if vault_path in line:
-            parts = line.split()
-            if len(parts) > 2 and os.path.isdir(parts[-1]):
-                return parts[-1]
-    return None # Vault found, but no valid mount point in the line
+def invalidate_mount_cache():
+    """Forgets the cached mount points, e.g. after a mount or dismount."""
+    global _mount_cache
+    _mount_cache = None
 
 def test_credentials(vault_path, password):
     """
@@ -31,13 +83,14 @@ def test_credentials(vault_path, password):
         return False, f"The specified VeraCrypt vault was not found at:\n{vault_path}"
 
     try:
-        command = ["veracrypt", "--text", "--test", "--password", password, "--non-interactive", vault_path]
-        process = subprocess.run(command, capture_output=True, text=True, check=False)
+        command = veracrypt_command("--test", "--password", password, vault_path)
+        # Binary pipes: the output is only decoded if there is an error to show.
+        process = subprocess.run(command, capture_output=True, check=False)
 
         if process.returncode == 0:
             return True, "The password is correct for the specified VeraCrypt vault."
         else:
-            error_output = process.stderr.strip()
+            error_output = process.stderr.decode(errors='replace').strip()
             return False, f"VeraCrypt test failed.\n\nError: {error_output}"
     except (subprocess.SubprocessError, FileNotFoundError) as e:
         return False, f"An unexpected error occurred while running the test: {e}"
\ No newline at end of file
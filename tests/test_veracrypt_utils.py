@@ -0,0 +1,63 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from veracrypt_utils import find_mount_point, _canonical_path
+
+
+class FindMountPointTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = os.path.realpath(self._tmp.name)
+        self.mount_point = os.path.join(self.tmp, 'mnt')
+        os.mkdir(self.mount_point)
+        self.vault = os.path.join(self.tmp, 'vault.hc')
+        open(self.vault, 'w').close()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def mounts_for(self, listed_volume):
+        """Builds a list_all_mounts result for one volume, keyed the way it keys them."""
+        return {_canonical_path(listed_volume): self.mount_point}
+
+    def test_exact_path(self):
+        self.assertEqual(find_mount_point(self.mounts_for(self.vault), self.vault), self.mount_point)
+
+    def test_differently_spelled_path(self):
+        spelled = os.path.join(self.tmp, 'mnt', '..', '.', 'vault.hc')
+        self.assertEqual(find_mount_point(self.mounts_for(self.vault), spelled), self.mount_point)
+
+    def test_symlinked_path(self):
+        link = os.path.join(self.tmp, 'link.hc')
+        os.symlink(self.vault, link)
+        self.assertEqual(find_mount_point(self.mounts_for(self.vault), link), self.mount_point)
+
+    def test_home_relative_path(self):
+        old_home = os.environ.get('HOME')
+        os.environ['HOME'] = self.tmp
+        try:
+            self.assertEqual(find_mount_point(self.mounts_for(self.vault), '~/vault.hc'), self.mount_point)
+        finally:
+            if old_home is None:
+                del os.environ['HOME']
+            else:
+                os.environ['HOME'] = old_home
+
+    def test_substring_fallback(self):
+        mounts = {'/dev/disk/by-id/usb-' + self.vault: self.mount_point}
+        self.assertEqual(find_mount_point(mounts, self.vault), self.mount_point)
+
+    def test_missing_mount_point(self):
+        mounts = {_canonical_path(self.vault): os.path.join(self.tmp, 'gone')}
+        self.assertIsNone(find_mount_point(mounts, self.vault))
+
+    def test_not_listed(self):
+        self.assertIsNone(find_mount_point({}, self.vault))
+
+
+if __name__ == '__main__':
+    unittest.main()